@@ -0,0 +1,160 @@
+import functools
+from collections import namedtuple
+import numpy as np
+from cache import load_tables
+
+# Directions in the same order Overboard.iter_moves tries them, so that
+# walking the action space in index order visits moves in iter_moves order.
+DIRECTIONS = [(0, -1), (0, +1), (-1, 0), (+1, 0)]
+
+
+def action_space_size(board_size):
+    return board_size * board_size * len(DIRECTIONS) * (board_size - 1)
+
+
+# Actions are laid out as ((square * 4) + direction) * (board_size - 1) +
+# (distance - 1), with square = row * board_size + col. Both functions also
+# work element-wise on NumPy arrays.
+def encode_action(square, direction, distance, board_size):
+    return (square * len(DIRECTIONS) + direction) * (board_size - 1) + distance - 1
+
+
+def decode_action(action, board_size):
+    square, rest = divmod(action, len(DIRECTIONS) * (board_size - 1))
+    direction, distance = divmod(rest, board_size - 1)
+    return square, direction, distance + 1
+
+
+def move_to_action(move, board_size):
+    (r, c), (end_r, end_c) = move.start, move.end
+    distance = abs(end_r - r) + abs(end_c - c)
+    direction = (
+        (end_r > r) - (end_r < r),
+        (end_c > c) - (end_c < c),
+    )
+    return encode_action(
+        r * board_size + c, DIRECTIONS.index(direction), distance, board_size
+    )
+
+
+def action_to_move(action, board_size):
+    square, direction, distance = decode_action(action, board_size)
+    r, c = divmod(square, board_size)
+    dr, dc = DIRECTIONS[direction]
+    return (r, c), (r + dr * distance, c + dc * distance)
+
+
+# For lines read towards increasing index: the first step that pushes a piece
+# off and the number of pieces that can be pushed off before one of our own
+# would follow, for every square of every line.
+def line_reach(own, occupied):
+    size = own.shape[-1]
+    index = np.arange(size)
+
+    ahead = np.cumsum(occupied[..., ::-1], axis=-1, dtype=np.int8)[..., ::-1] - occupied
+    last_own = size - 1 - np.argmax(own[..., ::-1], axis=-1)
+    beyond_last_own = np.take_along_axis(ahead, last_own[..., None], axis=-1)
+
+    first_capture = size - index - ahead
+    captures = np.where(last_own[..., None] > index, beyond_last_own, ahead)
+    return first_capture, captures
+
+
+# Tables grow as 4**n * n**2 entries, about 5 MB for 8x8 but already 125 MB
+# for 10x10, so they are only built up to MAX_BOARD_SIZE. Larger boards have
+# no line tables; Overboard.legal_action_mask fills its mask from iter_moves
+# instead.
+MAX_BOARD_SIZE = 8
+
+LineTables = namedtuple(
+    "LineTables", ["first_capture", "captures", "counts", "legal", "reverse"]
+)
+
+
+# Every line is fully described by the bits of the mover's pieces and the
+# occupied bits, so line_reach is evaluated once for all of them and looked up
+# by own_bits << board_size | occupied_bits afterwards. For every square of a
+# line the tables hold the first pushing step, the possible captures, the
+# number of legal distances and the legal distances themselves; reverse flips
+# the bits of a line.
+def build_line_tables(board_size):
+    bits = np.arange(1 << board_size, dtype="<u2")[:, None].view(np.uint8)
+    lines = np.unpackbits(bits, axis=1, count=board_size, bitorder="little")
+    own = np.broadcast_to(lines[:, None, :], (len(bits), len(bits), board_size))
+    occupied = np.broadcast_to(lines[None, :, :], own.shape)
+    own, occupied = own.astype(bool), occupied.astype(bool)
+    first_capture, captures = line_reach(own, occupied)
+
+    quiet = first_capture > 1
+    counts = (quiet + captures) * own
+
+    distance = np.arange(1, board_size)
+    legal = (
+        ((distance == 1) & quiet[..., None])
+        | (
+            (distance >= first_capture[..., None])
+            & (distance < (first_capture + captures)[..., None])
+        )
+    ) & own[..., None]
+
+    weights = (1 << np.arange(board_size)).astype(np.uint16)
+    return LineTables(
+        first_capture.astype(np.int8).reshape(-1, board_size),
+        captures.astype(np.int8).reshape(-1, board_size),
+        counts.astype(np.int8).reshape(-1, board_size),
+        legal.reshape(-1, board_size, board_size - 1),
+        (lines[:, ::-1] @ weights).astype(np.uint16),
+    )
+
+
+@functools.lru_cache
+def line_tables(board_size):
+    if board_size > MAX_BOARD_SIZE:
+        raise ValueError(
+            f"No line tables for {board_size}x{board_size} boards, the largest "
+            f"is {MAX_BOARD_SIZE}x{MAX_BOARD_SIZE}"
+        )
+
+    return LineTables(
+        *load_tables(
+            f"line-tables-{board_size}",
+            LineTables._fields,
+            lambda: build_line_tables(board_size),
+        )
+    )
+
+
+# Looks the rows and columns of a stack of boards up in the given line tables.
+# own and occupied are boolean arrays of shape (batch, size, size); for each
+# table the result has shape (batch, size, size, 4, ...) and holds the entry
+# of every square and direction. Results are written to out when given.
+def gather_lines(own, occupied, *tables, out=None):
+    board_size = own.shape[-1]
+    own = own.view(np.uint8)
+    occupied = occupied.view(np.uint8)
+    weights = (1 << np.arange(board_size)).astype(np.uint16)
+    reverse = line_tables(board_size).reverse
+
+    results = out or [
+        np.empty(own.shape + (4,) + table.shape[2:], dtype=table.dtype)
+        for table in tables
+    ]
+    for lines, vertical in [("nrc,c->nr", False), ("nrc,r->nc", True)]:
+        own_bits = np.einsum(lines, own, weights)
+        occupied_bits = np.einsum(lines, occupied, weights)
+
+        for backward in [False, True]:
+            if backward:
+                own_bits, occupied_bits = reverse[own_bits], reverse[occupied_bits]
+            index = own_bits.astype(np.intp) << board_size | occupied_bits
+            direction = 2 * vertical + (not backward)
+
+            for table, result in zip(tables, results):
+                values = np.take(table, index, axis=0)
+                if backward:
+                    values = values[:, :, ::-1]
+                if vertical:
+                    values = values.swapaxes(1, 2)
+                result[:, :, :, direction] = values
+
+    return results
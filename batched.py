@@ -0,0 +1,207 @@
+import time
+import numpy as np
+from overboard import Overboard
+from actions import (
+    DIRECTIONS,
+    action_space_size,
+    decode_action,
+    encode_action,
+    gather_lines,
+    line_tables,
+)
+
+
+class BatchedOverboard:
+    def __init__(self, batch_size, board_size=8, seed=None, max_moves=None):
+        assert board_size % 2 == 0
+
+        self.batch_size = batch_size
+        self.board_size = board_size
+        self.max_moves = 2 * board_size**2 if max_moves is None else max_moves
+        self.rng = np.random.default_rng(seed)
+
+        self.boards = np.zeros((batch_size, board_size, board_size), dtype=np.int8)
+        self.turns = np.full(batch_size, Overboard.PLAYER_WHITE, dtype=np.int8)
+        self.moves = np.zeros(batch_size, dtype=np.int32)
+        self.piece_counts = np.zeros((batch_size, 3), dtype=np.int32)
+
+        # Offsets along the slid row or column that read it in the direction
+        # of the slide, one row per entry of DIRECTIONS.
+        line = np.arange(board_size)
+        self.line_offsets = np.stack([line[::-1], line, line[::-1], line])
+
+        self.reset()
+
+    def reset(self, mask=None):
+        indices = np.arange(self.batch_size) if mask is None else np.flatnonzero(mask)
+        if not len(indices):
+            return
+
+        piece_count = self.board_size**2 // 2
+        pieces = np.repeat(
+            np.array([Overboard.PLAYER_WHITE, Overboard.PLAYER_RED], dtype=np.int8),
+            piece_count,
+        )
+        boards = self.rng.permuted(np.tile(pieces, (len(indices), 1)), axis=1)
+
+        self.boards[indices] = boards.reshape(-1, self.board_size, self.board_size)
+        self.turns[indices] = Overboard.PLAYER_WHITE
+        self.moves[indices] = 0
+        self.piece_counts[indices, Overboard.PLAYER_WHITE] = piece_count
+        self.piece_counts[indices, Overboard.PLAYER_RED] = piece_count
+
+    def get_winners(self):
+        winners = np.zeros(self.batch_size, dtype=np.int8)
+        winners[self.piece_counts[:, Overboard.PLAYER_RED] == 0] = (
+            Overboard.PLAYER_WHITE
+        )
+        winners[self.piece_counts[:, Overboard.PLAYER_WHITE] == 0] = (
+            Overboard.PLAYER_RED
+        )
+        return winners
+
+    def gather_lines(self, *tables):
+        return gather_lines(
+            self.boards == self.turns[:, None, None],
+            self.boards != Overboard.EMPTY,
+            *tables,
+        )
+
+    def legal_action_mask(self):
+        (legal,) = self.gather_lines(line_tables(self.board_size).legal)
+        return legal.reshape(self.batch_size, -1)
+
+    # Counting the legal distances of every (square, direction) pair lets us
+    # draw uniformly among legal moves without building the full action mask.
+    def random_actions(self):
+        tables = line_tables(self.board_size)
+        first_capture, counts = self.gather_lines(tables.first_capture, tables.counts)
+        first_capture = first_capture.reshape(self.batch_size, -1)
+        counts = counts.reshape(self.batch_size, -1)
+
+        cumulative = np.cumsum(counts, axis=1, dtype=np.int16)
+        totals = cumulative[:, -1]
+        choice = (self.rng.random(self.batch_size) * totals).astype(np.int16)
+        slot = np.argmax(cumulative > choice[:, None], axis=1)
+        rows = np.arange(self.batch_size)
+
+        j = choice - cumulative[rows, slot] + counts[rows, slot]
+        slot_first_capture = first_capture[rows, slot].astype(np.int16)
+        slot_quiet = slot_first_capture > 1
+        distances = np.where(
+            slot_quiet & (j == 0), 1, slot_first_capture + j - slot_quiet
+        )
+        squares, directions = np.divmod(slot, len(DIRECTIONS))
+        actions = encode_action(squares, directions, distances, self.board_size)
+        return np.where(totals > 0, actions, -1)
+
+    # Same choice as min_max.greedy_move: the first move, in iter_moves order,
+    # that pushes off the most pieces.
+    def greedy_actions(self):
+        tables = line_tables(self.board_size)
+        first_capture, captures, counts = self.gather_lines(
+            tables.first_capture, tables.captures, tables.counts
+        )
+        first_capture = first_capture.reshape(self.batch_size, -1)
+        captures = captures.reshape(self.batch_size, -1)
+        legal = counts.reshape(self.batch_size, -1) > 0
+
+        slot = np.argmax(np.where(legal, captures, -1), axis=1)
+        rows = np.arange(self.batch_size)
+
+        best = captures[rows, slot].astype(np.int16)
+        distances = np.where(best > 0, first_capture[rows, slot] + best - 1, 1)
+        squares, directions = np.divmod(slot, len(DIRECTIONS))
+        actions = encode_action(squares, directions, distances, self.board_size)
+        return np.where(legal.any(axis=1), actions, -1)
+
+    # Applies one action per board, then resets every finished game. Boards
+    # without a legal move pass -1 and lose, and so does a board given an
+    # illegal action, which is left as it was. Returns the winner of each
+    # game that finished on this step, 0 for draws, and the mask of finished
+    # games.
+    def step(self, actions):
+        size = self.board_size
+        rows = np.arange(self.batch_size)
+        in_range = (actions >= 0) & (actions < action_space_size(size))
+        squares, directions, distances = decode_action(
+            np.where(in_range, actions, 0), size
+        )
+        r, c = np.divmod(squares, size)
+
+        offsets = self.line_offsets[directions]
+        vertical = directions[:, None] >= 2
+        line_rows = np.where(vertical, offsets, r[:, None])
+        line_cols = np.where(vertical, c[:, None], offsets)
+        index = np.choose(directions, [size - 1 - c, c, size - 1 - r, r])
+
+        lines = self.boards[rows[:, None], line_rows, line_cols]
+        position = np.arange(size)
+        occupied = lines != Overboard.EMPTY
+        ahead = position > index[:, None]
+        gaps = np.cumsum(~occupied & ahead, axis=1)
+
+        # The same reach as Overboard.get_line_reach, read off the gathered
+        # line: the opponent pieces beyond our farthest piece ahead can go.
+        own = lines == self.turns[:, None]
+        last_own = np.max(np.where(own & ahead, position, index[:, None]), axis=1)
+        first_capture = gaps[:, -1] + 1
+        last_step = (
+            first_capture + (occupied & (position > last_own[:, None])).sum(axis=1) - 1
+        )
+        legal = (
+            in_range
+            & own[rows, index]
+            & (
+                ((distances == 1) & (first_capture > 1))
+                | ((distances >= first_capture) & (distances <= last_step))
+            )
+        )
+        forfeit = ~legal
+        distances = np.where(forfeit, 0, distances)
+
+        pushed = occupied & ahead
+        new_position = np.where(
+            pushed, position + np.maximum(0, distances[:, None] - gaps), position
+        )
+        new_position[rows, index] += distances
+        survives = occupied & (new_position < size)
+
+        new_lines = np.zeros_like(lines)
+        line_index = np.broadcast_to(rows[:, None], lines.shape)
+        new_lines[line_index[survives], new_position[survives]] = lines[survives]
+        self.boards[rows[:, None], line_rows, line_cols] = new_lines
+
+        captured = occupied & ~survives
+        for player in [Overboard.PLAYER_WHITE, Overboard.PLAYER_RED]:
+            self.piece_counts[:, player] -= (captured & (lines == player)).sum(axis=1)
+
+        opponents = np.where(
+            self.turns == Overboard.PLAYER_WHITE,
+            Overboard.PLAYER_RED,
+            Overboard.PLAYER_WHITE,
+        )
+        winners = self.get_winners()
+        winners[forfeit] = opponents[forfeit]
+        self.turns = opponents
+        self.moves += 1
+
+        done = (winners != 0) | (self.moves >= self.max_moves)
+        self.reset(done)
+        return winners, done
+
+
+def moves_per_second(policy, batch_size=4096, board_size=8, steps=50, seed=0):
+    env = BatchedOverboard(batch_size, board_size, seed)
+    started = time.perf_counter()
+    for _ in range(steps):
+        env.step(policy(env))
+    return batch_size * steps / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    for name, policy in [
+        ("random", BatchedOverboard.random_actions),
+        ("greedy", BatchedOverboard.greedy_actions),
+    ]:
+        print(f"{name}: {moves_per_second(policy):,.0f} moves/s")
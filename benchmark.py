@@ -0,0 +1,543 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import numpy as np
+from mcts import MCTS
+from min_max import min_max, random_move, greedy_move, min_max_move
+from overboard import Overboard
+from perft import ENGINES, perft
+from search import AlphaBetaSearch
+from tournament import game_seeds, play_game
+
+AGENTS = {
+    "random_move": random_move,
+    "greedy_move": greedy_move,
+    "min_max_move": min_max_move,
+}
+
+# min_max_move looks three moves ahead without pruning, so full games are
+# only practical on small boards.
+AGENT_MAX_BOARD_SIZE = {"min_max_move": 4}
+
+# Board sizes of the scaling benchmark, which only times the operations that
+# stay cheap on large boards.
+SCALING_BOARD_SIZES = [8, 16, 24, 32]
+
+
+# Worker counts of the parallel search benchmark, capped at the number of
+# CPUs.
+PARALLEL_WORKERS = [1, 2, 4, 8]
+
+
+# What a fresh process pays before it can do any work: importing the modules
+# the TUI and the tournament workers start from, and playing a first move on
+# every engine, which builds or loads the precomputed tables.
+STARTUP_SCRIPTS = {
+    "python": "pass",
+    "import overboard": "import overboard",
+    "import game_runner": "import game_runner",
+    "import tournament": "import tournament",
+    **{
+        f"first move {name}": (
+            "import random\n"
+            "from perft import ENGINES\n"
+            f"overboard = ENGINES[{name!r}](8)\n"
+            "overboard.initialize_randomly()\n"
+            "move = random.choice(overboard.get_moves())\n"
+            "overboard.get_preview_board(move[0], move[1])\n"
+            "overboard.legal_action_mask()"
+        )
+        for name in ["tables", "bitboard", "sparse"]
+    },
+}
+
+
+def supports(engine, board_size):
+    return board_size <= getattr(engine, "MAX_BOARD_SIZE", board_size)
+
+
+# The corpus is a set of random starts advanced by a few random moves, so it
+# covers both crowded openings and sparser middle games. It only depends on
+# the seed, which keeps results comparable between versions.
+def seeded_positions(board_size, count=20, seed=0):
+    random.seed(seed)
+    overboard = Overboard(board_size)
+
+    positions = []
+    while len(positions) < count:
+        overboard.initialize_randomly()
+        for _ in range(random.randint(0, 2 * board_size)):
+            if overboard.get_winner() is not None:
+                break
+            overboard.make_move(random.choice(list(overboard.iter_moves())))
+
+        if overboard.get_winner() is None:
+            positions.append((overboard.board.copy(), overboard.turn))
+
+    return positions
+
+
+def load_positions(engine, positions):
+    overboards = []
+    for board, turn in positions:
+        overboard = engine(board_size=len(board))
+        overboard.initialize(board, turn)
+        overboards.append(overboard)
+    return overboards
+
+
+def best_time(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+
+def result(benchmark, engine, board_size, operations, seconds, unit, **extra):
+    return {
+        "benchmark": benchmark,
+        "engine": engine,
+        "board_size": board_size,
+        "operations": operations,
+        "seconds": seconds,
+        "rate": operations / seconds,
+        "unit": unit,
+        **extra,
+    }
+
+
+def benchmark_get_moves(overboards, repeat):
+    moves = sum(len(o.get_moves()) for o in overboards)
+    seconds = best_time(lambda: [o.get_moves() for o in overboards], repeat)
+    return moves, seconds
+
+
+def benchmark_iter_moves(overboards, repeat):
+    moves = sum(1 for o in overboards for _ in o.iter_moves())
+    seconds = best_time(lambda: [list(o.iter_moves()) for o in overboards], repeat)
+    return moves, seconds
+
+
+def benchmark_preview(overboards, repeat):
+    moves = [(o, list(o.iter_moves())) for o in overboards]
+
+    def run():
+        for overboard, overboard_moves in moves:
+            for move in overboard_moves:
+                overboard.get_preview_board(move.start, move.end)
+
+    return sum(len(m) for _, m in moves), best_time(run, repeat)
+
+
+def benchmark_make_move(overboards, repeat):
+    moves = [(o, list(o.iter_moves())) for o in overboards]
+
+    def run():
+        for overboard, overboard_moves in moves:
+            for move in overboard_moves:
+                overboard.make_move(move)
+                overboard.unmake_move()
+
+    return sum(len(m) for _, m in moves), best_time(run, repeat)
+
+
+def benchmark_get_winner(overboards, repeat, calls=1000):
+    def run():
+        for overboard in overboards:
+            for _ in range(calls):
+                overboard.get_winner()
+
+    return len(overboards) * calls, best_time(run, repeat)
+
+
+# min_max has no pruning, so the nodes it visits are exactly the nodes of
+# this walk: every position down to the depth, stopping early at wins.
+def count_nodes(overboard, depth):
+    if depth == 0 or overboard.get_winner() is not None:
+        return 1
+
+    nodes = 1
+    for move in overboard.iter_moves():
+        overboard.make_move(move)
+        nodes += count_nodes(overboard, depth - 1)
+        overboard.unmake_move()
+    return nodes
+
+
+def benchmark_perft(overboards, depth, repeat):
+    nodes = sum(perft(o, depth) for o in overboards)
+    return nodes, best_time(lambda: [perft(o, depth) for o in overboards], repeat)
+
+
+def benchmark_min_max(overboards, depth, repeat):
+    def run():
+        for overboard in overboards:
+            min_max(overboard, overboard.turn == Overboard.PLAYER_WHITE, depth)
+
+    nodes = sum(count_nodes(o, depth) for o in overboards)
+    return nodes, best_time(run, repeat)
+
+
+def benchmark_alpha_beta(overboards, depth, repeat):
+    search = AlphaBetaSearch(max_depth=depth)
+    nodes = sum(search.search(o).stats["nodes"] for o in overboards)
+    return nodes, best_time(lambda: [search.search(o) for o in overboards], repeat)
+
+
+def benchmark_mcts(overboards, iterations):
+    search = MCTS(iterations, reuse_tree=False)
+    seconds = sum(search.search(o).stats["time"] for o in overboards)
+    return len(overboards) * iterations, seconds
+
+
+def benchmark_games(agent, engine, board_size, games, seed):
+    moves = 0
+    started = time.perf_counter()
+    for game_seed in game_seeds(seed, games):
+        _, t = play_game(agent, agent, game_seed, board_size, engine)
+        moves += t
+    return games, moves, time.perf_counter() - started
+
+
+def recorder(results, progress):
+    def record(*args, **kwargs):
+        results.append(result(*args, **kwargs))
+        if progress is not None:
+            entry = results[-1]
+            label = " ".join(
+                str(part) for part in result_key(entry) if part is not None
+            )
+            progress(f"{label}: {entry['rate']:,.0f} {entry['unit']}")
+
+    return record
+
+
+def run_benchmarks(
+    board_sizes=(4, 6, 8),
+    engines=tuple(ENGINES),
+    agents=tuple(AGENTS),
+    positions=20,
+    games=10,
+    repeat=5,
+    min_max_depths=(1, 2),
+    mcts_iterations=200,
+    seed=0,
+    progress=None,
+):
+    results = []
+    record = recorder(results, progress)
+
+    for board_size in board_sizes:
+        corpus = seeded_positions(board_size, positions, seed)
+
+        for name in engines:
+            engine = ENGINES[name]
+            if not supports(engine, board_size):
+                continue
+            overboards = load_positions(engine, corpus)
+
+            for benchmark, function, unit in [
+                ("get_moves", benchmark_get_moves, "moves/s"),
+                ("iter_moves", benchmark_iter_moves, "moves/s"),
+                ("preview", benchmark_preview, "previews/s"),
+                ("make_move", benchmark_make_move, "moves/s"),
+                ("get_winner", benchmark_get_winner, "calls/s"),
+            ]:
+                record(benchmark, name, board_size, *function(overboards, repeat), unit)
+
+            for depth in min_max_depths:
+                for benchmark, function in [
+                    ("perft", benchmark_perft),
+                    ("min_max", benchmark_min_max),
+                    ("alpha_beta", benchmark_alpha_beta),
+                ]:
+                    nodes, seconds = function(overboards, depth, repeat)
+                    record(
+                        benchmark,
+                        name,
+                        board_size,
+                        nodes,
+                        seconds,
+                        "nodes/s",
+                        depth=depth,
+                    )
+
+            record(
+                "mcts",
+                name,
+                board_size,
+                *benchmark_mcts(overboards, mcts_iterations),
+                "iterations/s",
+            )
+
+            for agent in agents:
+                if board_size > AGENT_MAX_BOARD_SIZE.get(agent, board_size):
+                    continue
+
+                played, moves, seconds = benchmark_games(
+                    AGENTS[agent], engine, board_size, games, seed
+                )
+                record(
+                    "games",
+                    name,
+                    board_size,
+                    played,
+                    seconds,
+                    "games/s",
+                    agent=agent,
+                    moves=moves,
+                )
+
+    return results
+
+
+# Move generation and make/unmake_move per position on growing boards. The
+# time per position shows how each engine scales: with the board area, or
+# only with the pieces of the side to move.
+def run_scaling_benchmarks(
+    board_sizes=tuple(SCALING_BOARD_SIZES),
+    engines=tuple(ENGINES),
+    positions=20,
+    repeat=5,
+    seed=0,
+    progress=None,
+):
+    results = []
+    record = recorder(results, progress)
+
+    for board_size in board_sizes:
+        corpus = seeded_positions(board_size, positions, seed)
+
+        for name in engines:
+            engine = ENGINES[name]
+            if not supports(engine, board_size):
+                continue
+            overboards = load_positions(engine, corpus)
+
+            for benchmark, function, unit in [
+                ("iter_moves", benchmark_iter_moves, "moves/s"),
+                ("make_move", benchmark_make_move, "moves/s"),
+            ]:
+                operations, seconds = function(overboards, repeat)
+                record(
+                    benchmark,
+                    name,
+                    board_size,
+                    operations,
+                    seconds,
+                    unit,
+                    seconds_per_position=seconds / len(overboards),
+                )
+
+    return results
+
+
+# Nodes per second of RootParallelSearch on the same positions for every
+# worker count, with the speedup over one worker. Pools are started before
+# timing, so only the searches are measured.
+def run_parallel_benchmarks(
+    board_sizes=(8,),
+    worker_counts=None,
+    depth=3,
+    positions=4,
+    seed=0,
+    progress=None,
+):
+    from parallel_search import RootParallelSearch
+
+    worker_counts = worker_counts or sorted(
+        {min(workers, os.cpu_count()) for workers in PARALLEL_WORKERS}
+    )
+    results = []
+    record = recorder(results, progress)
+
+    for board_size in board_sizes:
+        overboards = load_positions(
+            Overboard, seeded_positions(board_size, positions, seed)
+        )
+        serial_seconds = None
+        for workers in worker_counts:
+            search = RootParallelSearch(depth, workers)
+            search.search(overboards[0])
+            nodes, seconds = 0, 0.0
+            for overboard in overboards:
+                stats = search.search(overboard).stats
+                nodes += stats["nodes"]
+                seconds += stats["time"]
+            search.close()
+
+            serial_seconds = serial_seconds or seconds
+            record(
+                "parallel_search",
+                "tables",
+                board_size,
+                nodes,
+                seconds,
+                "nodes/s",
+                depth=depth,
+                workers=workers,
+                speedup=serial_seconds / seconds,
+            )
+
+    return results
+
+
+def time_script(script, cache_directory):
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "OVERBOARD_CACHE": cache_directory},
+    )
+    return time.perf_counter() - started
+
+
+# Every script runs in a new interpreter. The first run uses an empty table
+# cache and the best of the others a warm one, as a process pool worker
+# started after the tables were first built would.
+def run_startup_benchmarks(repeat=5, progress=None):
+    results = []
+    record = recorder(results, progress)
+
+    for name, script in STARTUP_SCRIPTS.items():
+        with tempfile.TemporaryDirectory() as cache_directory:
+            cold = time_script(script, cache_directory)
+            warm = min(time_script(script, cache_directory) for _ in range(repeat))
+        record("startup", name, None, 1, cold, "starts/s", cache="cold")
+        record("startup", name, None, 1, warm, "starts/s", cache="warm")
+
+    return results
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def result_key(entry):
+    return (
+        entry["benchmark"],
+        entry["engine"],
+        entry["board_size"],
+        entry.get("depth"),
+        entry.get("agent"),
+        entry.get("cache"),
+        entry.get("workers"),
+    )
+
+
+# Rates of the current run relative to a baseline run; anything slower than
+# the tolerance is reported as a regression.
+def compare(baseline, current, tolerance=0.1):
+    baseline_rates = {result_key(e): e["rate"] for e in baseline["results"]}
+
+    regressions = []
+    for entry in current["results"]:
+        key = result_key(entry)
+        if key not in baseline_rates:
+            continue
+
+        ratio = entry["rate"] / baseline_rates[key]
+        label = " ".join(str(part) for part in key if part is not None)
+        print(f"{label}: {ratio:.2f}x")
+        if ratio < 1 - tolerance:
+            regressions.append((label, ratio))
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--board-sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--agents", nargs="+", choices=AGENTS, default=list(AGENTS))
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--mcts-iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument(
+        "--scaling",
+        action="store_true",
+        help="only time move generation, on boards from 8x8 to 32x32",
+    )
+    parser.add_argument(
+        "--startup",
+        action="store_true",
+        help="only time imports and first moves in fresh processes",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="only time RootParallelSearch with 1 to 8 workers",
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+
+    progress = lambda line: print(line, file=sys.stderr)
+    if args.startup:
+        results = run_startup_benchmarks(args.repeat, progress)
+    elif args.parallel:
+        results = run_parallel_benchmarks(
+            args.board_sizes or [8], args.workers, seed=args.seed, progress=progress
+        )
+    elif args.scaling:
+        results = run_scaling_benchmarks(
+            args.board_sizes or SCALING_BOARD_SIZES,
+            args.engines,
+            args.positions,
+            args.repeat,
+            args.seed,
+            progress,
+        )
+    else:
+        results = run_benchmarks(
+            args.board_sizes or [4, 6, 8],
+            args.engines,
+            args.agents,
+            args.positions,
+            args.games,
+            args.repeat,
+            args.depths,
+            args.mcts_iterations,
+            args.seed,
+            progress,
+        )
+
+    report = {
+        "environment": environment(),
+        "parameters": {
+            "positions": args.positions,
+            "games": args.games,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for label, ratio in regressions:
+            print(f"Regression: {label} at {ratio:.2f}x of baseline", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,740 @@
+import functools
+import random
+import time
+import numpy as np
+from overboard import (
+    GameState,
+    Overboard,
+    InvalidMove,
+    Move,
+    ReferenceOverboard,
+    zobrist_keys,
+)
+from transitions import line_transitions
+
+# Square (r, c) lives on bit r * STRIDE + c, so every row is one byte and
+# boards up to 8x8 fit in a 64-bit word.
+STRIDE = 8
+ROW_MASK = (1 << STRIDE) - 1
+FILE_MASK = 0x0101010101010101
+FILE_TO_RANK = 0x0102040810204080
+
+COLUMN_SPREAD = [
+    sum(1 << (r * STRIDE) for r in range(STRIDE) if line >> r & 1)
+    for line in range(1 << STRIDE)
+]
+
+# The base 3 digits of a line (see transitions.line_digits) with a 1 on every
+# set bit, so a line of first and second pieces has the code
+# TERNARY[first] + 2 * TERNARY[second].
+TERNARY = [
+    sum(3**i for i in range(STRIDE) if line >> i & 1) for line in range(1 << STRIDE)
+]
+
+_LINE_ARRAYS = {}
+
+
+def line_array(size, white_line, red_line):
+    key = (size, white_line, red_line)
+    array = _LINE_ARRAYS.get(key)
+    if array is None:
+        array = np.array(
+            [
+                (
+                    Overboard.PLAYER_WHITE
+                    if white_line >> i & 1
+                    else Overboard.PLAYER_RED if red_line >> i & 1 else Overboard.EMPTY
+                )
+                for i in range(size)
+            ]
+        )
+        array.flags.writeable = False
+        _LINE_ARRAYS[key] = array
+    return array
+
+
+def slide_line(white_line, red_line, size, index, direction, steps):
+    full = (1 << size) - 1
+    for _ in range(steps):
+        empty = ~(white_line | red_line) & full
+        if direction > 0:
+            gaps = empty >> index << index
+            run = ((gaps & -gaps) - 1 if gaps else full) >> index << index
+            white_line = ((white_line & ~run) | ((white_line & run) << 1)) & full
+            red_line = ((red_line & ~run) | ((red_line & run) << 1)) & full
+        else:
+            gaps = empty & ((1 << index) - 1)
+            run = ((1 << (index + 1)) - 1) ^ ((1 << gaps.bit_length()) - 1)
+            white_line = (white_line & ~run) | ((white_line & run) >> 1)
+            red_line = (red_line & ~run) | ((red_line & run) >> 1)
+        index += direction
+    return white_line, red_line
+
+
+# Pieces always leave the far end of the line first, one per step once every
+# gap ahead of the slider is closed. Returns the first step that pushes a
+# piece off and the last step before one of our own pieces would go over.
+def line_reach(own_line, occupied_line, size, index, direction):
+    if direction > 0:
+        ahead = occupied_line >> (index + 1)
+        pieces = ahead.bit_count()
+        first_capture = size - index - pieces
+        own_ahead = own_line >> (index + 1)
+        captures = (
+            (ahead >> own_ahead.bit_length()).bit_count() if own_ahead else pieces
+        )
+    else:
+        below = (1 << index) - 1
+        ahead = occupied_line & below
+        pieces = ahead.bit_count()
+        first_capture = index + 1 - pieces
+        own_ahead = own_line & below
+        captures = (
+            (ahead & ((own_ahead & -own_ahead) - 1)).bit_count()
+            if own_ahead
+            else pieces
+        )
+    return first_capture, first_capture + captures - 1
+
+
+def line_code(first_line, second_line):
+    return TERNARY[first_line] + 2 * TERNARY[second_line]
+
+
+# The line bits of the pieces of digit 1 and of digit 2 of every line code,
+# to turn codes back into bitboards.
+@functools.lru_cache
+def code_lines(size):
+    lines = []
+    for code in range(3**size):
+        first_line = second_line = 0
+        for i in range(size):
+            code, digit = divmod(code, 3)
+            if digit == 1:
+                first_line |= 1 << i
+            elif digit == 2:
+                second_line |= 1 << i
+        lines.append((first_line, second_line))
+    return lines
+
+
+# The code of every line with the colours of its pieces swapped.
+@functools.lru_cache
+def swapped_codes(size):
+    return [
+        line_code(red_line, white_line) for white_line, red_line in code_lines(size)
+    ]
+
+
+# Everything the engine needs to know about a line, for every code of the
+# line with the side to move as digit 1 and the opponent as digit 2, and every
+# square of the side to move, as a tuple of
+#   - the reaches (see line_reach) backward and forward,
+#   - the moves along the line as (end index, direction, captures), once with
+#     row and once with column directions,
+#   - for every end index the piece can slide to, including its own, the
+#     code of the line after the slide (from transitions.line_transitions)
+#     and whether it is a legal move, or None.
+# A line has at most 3**8 contents, so the table is built whole the first
+# time a board size is used, and no position needs anything but lookups.
+@functools.lru_cache
+def line_moves_table(size):
+    results = line_transitions(size).results.tolist()
+    table = []
+    for code, (own_line, opponent_line) in enumerate(code_lines(size)):
+        occupied_line = own_line | opponent_line
+        entry = []
+        for index in range(size):
+            if not own_line >> index & 1:
+                entry.append(None)
+                continue
+
+            reaches = tuple(
+                line_reach(own_line, occupied_line, size, index, direction)
+                for direction in (-1, +1)
+            )
+            moves = []
+            slides = [None] * size
+            slides[index] = (code, True)
+            for d, (direction, (first_capture, last_step)) in enumerate(
+                zip((-1, +1), reaches)
+            ):
+                for step in range(1, last_step + 1):
+                    end = index + step * direction
+                    valid = step == 1 or step >= first_capture
+                    slides[end] = (results[code][index][d][step - 1], valid)
+                    if valid:
+                        moves.append((end, direction, max(0, step - first_capture + 1)))
+            entry.append(
+                (
+                    reaches,
+                    tuple((end, (0, d), captures) for end, d, captures in moves),
+                    tuple((end, (d, 0), captures) for end, d, captures in moves),
+                    tuple(slides),
+                )
+            )
+        table.append(tuple(entry))
+    return table
+
+
+# The Zobrist keys of overboard.zobrist_keys by bit index rather than square.
+@functools.lru_cache
+def stride_zobrist_keys(size):
+    pieces, _ = zobrist_keys(size)
+    return {
+        player: [
+            keys[r * size + c] if r < size and c < size else 0
+            for r in range(STRIDE)
+            for c in range(STRIDE)
+        ]
+        for player, keys in pieces.items()
+    }
+
+
+# A line holds at most 3**8 distinct contents, so the slides of every
+# (contents, piece, direction) triple are worth remembering.
+@functools.lru_cache(maxsize=1 << 16)
+def line_slides(size, white_to_move, white_line, red_line, index, direction):
+    own_line = white_line if white_to_move else red_line
+    first_capture, last_step = line_reach(
+        own_line, white_line | red_line, size, index, direction
+    )
+
+    slides = []
+    for step in range(1, last_step + 1):
+        white_line, red_line = slide_line(
+            white_line, red_line, size, index, direction, 1
+        )
+        index += direction
+        slides.append(
+            (
+                index,
+                line_array(size, white_line, red_line),
+                step == 1 or step >= first_capture,
+            )
+        )
+    return tuple(slides)
+
+
+class BitboardOverboard(Overboard):
+    MAX_BOARD_SIZE = STRIDE
+
+    def __init__(self, board_size=8, debug=False):
+        assert board_size <= self.MAX_BOARD_SIZE
+        super().__init__(board_size, debug)
+
+    @staticmethod
+    def from_numpy(board, turn=Overboard.PLAYER_WHITE):
+        assert board.shape[0] == board.shape[1]
+
+        overboard = BitboardOverboard(board_size=board.shape[0])
+        overboard.initialize(board, turn)
+        return overboard
+
+    @property
+    def board(self):
+        if self._board is None:
+            self._board = self.to_numpy()
+            self._board.flags.writeable = False
+        return self._board
+
+    def reset(self):
+        self.initialized = False
+        self.white = 0
+        self.red = 0
+        self._board = None
+        self.turn = self.PLAYER_WHITE
+        self.history = []
+        self.compute_hash()
+
+    def initialize_randomly(self):
+        self.reset()
+        self.initialized = True
+
+        piece_count = self.board_size**2 // 2
+
+        pieces = [self.PLAYER_WHITE] * piece_count + [self.PLAYER_RED] * piece_count
+        random.shuffle(pieces)
+
+        for r in range(self.board_size):
+            for c in range(self.board_size):
+                bit = 1 << (r * STRIDE + c)
+                if pieces[r * self.board_size + c] == self.PLAYER_WHITE:
+                    self.white |= bit
+                else:
+                    self.red |= bit
+
+        self.compute_hash()
+
+    def initialize(self, board, turn):
+        assert board.shape[0] % 2 == 0
+        assert board.shape[0] == board.shape[1]
+        assert board.shape[0] <= self.MAX_BOARD_SIZE
+
+        self.board_size = board.shape[0]
+        self.reset()
+        self.initialized = True
+
+        self.white = self.pack(board == self.PLAYER_WHITE)
+        self.red = self.pack(board == self.PLAYER_RED)
+        self.turn = turn
+        self.compute_hash()
+
+    def initialize_bitboards(self, white, red, turn):
+        assert not white & red
+
+        self.reset()
+        self.initialized = True
+
+        self.white = white
+        self.red = red
+        self.turn = turn
+        self.compute_hash()
+
+    def compute_hash(self):
+        self.zobrist_pieces, self.zobrist_turn = zobrist_keys(self.board_size)
+        self.zobrist_bits = stride_zobrist_keys(self.board_size)
+
+        self.hash = 0 if self.turn == self.PLAYER_WHITE else self.zobrist_turn
+        self.toggle_hash(self.white, self.PLAYER_WHITE)
+        self.toggle_hash(self.red, self.PLAYER_RED)
+
+    def toggle_hash(self, bitboard, piece):
+        keys = self.zobrist_bits[piece]
+        while bitboard:
+            bit = bitboard & -bitboard
+            self.hash ^= keys[bit.bit_length() - 1]
+            bitboard ^= bit
+
+    def pack(self, mask):
+        padded = np.zeros((self.board_size, STRIDE), dtype=bool)
+        padded[:, : self.board_size] = mask
+        return int.from_bytes(
+            np.packbits(padded, axis=1, bitorder="little").tobytes(), "little"
+        )
+
+    def unpack(self, bitboard):
+        rows = np.frombuffer(bitboard.to_bytes(STRIDE, "little"), dtype=np.uint8)
+        bits = np.unpackbits(rows, bitorder="little").reshape(STRIDE, STRIDE)
+        return bits[: self.board_size, : self.board_size].astype(int)
+
+    def to_numpy(self, white=None, red=None):
+        white = self.white if white is None else white
+        red = self.red if red is None else red
+        return (
+            self.unpack(white) * self.PLAYER_WHITE + self.unpack(red) * self.PLAYER_RED
+        )
+
+    def check_counters(self):
+        assert not self.white & self.red
+        assert self.hash == Overboard.from_numpy(self.board, self.turn).hash
+
+    def get_piece_count(self, player):
+        return (self.white if player == self.PLAYER_WHITE else self.red).bit_count()
+
+    # States put rows board_size bits apart rather than STRIDE, so the rows
+    # are moved one by one unless the board is the full 8x8.
+    def restride(self, bitboard, old_stride, new_stride):
+        if old_stride == new_stride:
+            return bitboard
+        mask = (1 << self.board_size) - 1
+        return sum(
+            ((bitboard >> (r * old_stride)) & mask) << (r * new_stride)
+            for r in range(self.board_size)
+        )
+
+    def get_state(self):
+        return GameState(
+            self.board_size,
+            self.restride(self.white, STRIDE, self.board_size),
+            self.restride(self.red, STRIDE, self.board_size),
+            self.turn,
+            self.hash,
+        )
+
+    # The state already carries the hash, so the bitboards are set directly
+    # instead of through initialize_bitboards.
+    def set_state(self, state: GameState):
+        assert state.board_size == self.board_size
+
+        self.reset()
+        self.initialized = True
+        self.white = self.restride(state.white, self.board_size, STRIDE)
+        self.red = self.restride(state.red, self.board_size, STRIDE)
+        self.turn = state.turn
+        self.hash = state.hash
+
+    def get_winner(self):
+        if not self.red:
+            return self.PLAYER_WHITE
+
+        if not self.white:
+            return self.PLAYER_RED
+
+        return None
+
+    def own_and_opponent(self):
+        if self.turn == self.PLAYER_WHITE:
+            return self.white, self.red
+        return self.red, self.white
+
+    def is_own_piece(self, position):
+        own, _ = self.own_and_opponent()
+        return bool(own >> (position[0] * STRIDE + position[1]) & 1)
+
+    def get_player_piece_positions(self):
+        assert self.initialized == True
+
+        own, _ = self.own_and_opponent()
+        positions = []
+        while own:
+            bit = own & -own
+            positions.append(divmod(bit.bit_length() - 1, STRIDE))
+            own ^= bit
+        return positions
+
+    @staticmethod
+    def row_line(bitboard, row):
+        return (bitboard >> (row * STRIDE)) & ROW_MASK
+
+    @staticmethod
+    def column_line(bitboard, col):
+        return (((bitboard >> col) & FILE_MASK) * FILE_TO_RANK >> 56) & ROW_MASK
+
+    # The codes (see line_code) of every row and column, with the side to
+    # move as digit 1, for looking lines up in line_moves_table.
+    def line_codes(self):
+        own, opponent = self.own_and_opponent()
+        rows = [
+            line_code(self.row_line(own, r), self.row_line(opponent, r))
+            for r in range(self.board_size)
+        ]
+        cols = [
+            line_code(self.column_line(own, c), self.column_line(opponent, c))
+            for c in range(self.board_size)
+        ]
+        return rows, cols
+
+    def get_moves(self):
+        moves = []
+        for piece in self.get_player_piece_positions():
+            moves.extend(
+                (piece, end_position, preview)
+                for end_position, preview, _ in self.get_slides_for_piece(piece)
+            )
+        return moves
+
+    def get_slides_for_piece(self, piece_position, valid_only=True):
+        row, col = map(int, piece_position)
+        own, _ = self.own_and_opponent()
+        assert own >> (row * STRIDE + col) & 1
+
+        tables = line_transitions(self.board_size)
+        row_code = line_code(*self.get_line((row, col), (0, 1)))
+        col_code = line_code(*self.get_line((row, col), (1, 0)))
+
+        slides = []
+        for direction in (-1, +1):
+            for i, preview, valid in tables.code_slides(row_code, col, direction):
+                if valid or not valid_only:
+                    slides.append(((row, i), preview, valid))
+        for direction in (-1, +1):
+            for i, preview, valid in tables.code_slides(col_code, row, direction):
+                if valid or not valid_only:
+                    slides.append(((i, col), preview, valid))
+
+        return slides
+
+    def get_line(self, position, axis):
+        if axis == (0, 1):
+            return (
+                self.row_line(self.white, position[0]),
+                self.row_line(self.red, position[0]),
+            )
+        return (
+            self.column_line(self.white, position[1]),
+            self.column_line(self.red, position[1]),
+        )
+
+    def get_line_reach(self, line, index, direction):
+        white_line, red_line = line
+        own_line = white_line if self.turn == self.PLAYER_WHITE else red_line
+        return line_reach(
+            own_line, white_line | red_line, self.board_size, index, direction
+        )
+
+    # Like Overboard.iter_reaches, with the reaches of every line looked up
+    # in line_moves_table.
+    def iter_reaches(self):
+        table = line_moves_table(self.board_size)
+        rows, cols = self.line_codes()
+        for r, c in self.get_player_piece_positions():
+            left, right = table[rows[r]][c][0]
+            up, down = table[cols[c]][r][0]
+            yield (r, c), (0, -1), *left
+            yield (r, c), (0, +1), *right
+            yield (r, c), (-1, 0), *up
+            yield (r, c), (+1, 0), *down
+
+    def iter_moves(self):
+        table = line_moves_table(self.board_size)
+        rows, cols = self.line_codes()
+        for r, c in self.get_player_piece_positions():
+            for end, direction, captures in table[rows[r]][c][1]:
+                yield Move((r, c), (r, end), direction, captures)
+            for end, direction, captures in table[cols[c]][r][2]:
+                yield Move((r, c), (end, c), direction, captures)
+
+    # iter_moves in the two stages of Overboard.iter_captures and
+    # iter_quiet_moves.
+    def iter_captures(self):
+        table = line_moves_table(self.board_size)
+        rows, cols = self.line_codes()
+        for r, c in self.get_player_piece_positions():
+            for end, direction, captures in table[rows[r]][c][1]:
+                if captures:
+                    yield Move((r, c), (r, end), direction, captures)
+            for end, direction, captures in table[cols[c]][r][2]:
+                if captures:
+                    yield Move((r, c), (end, c), direction, captures)
+
+    def iter_quiet_moves(self):
+        table = line_moves_table(self.board_size)
+        rows, cols = self.line_codes()
+        for r, c in self.get_player_piece_positions():
+            for end, direction, captures in table[rows[r]][c][1]:
+                if not captures:
+                    yield Move((r, c), (r, end), direction, 0)
+            for end, direction, captures in table[cols[c]][r][2]:
+                if not captures:
+                    yield Move((r, c), (end, c), direction, 0)
+
+    # Looks a move up in line_moves_table like Overboard.get_move checks it.
+    # Returns whether the move slides a column, the code (see line_code) of
+    # the white and red pieces of its line after the move, and whether it is
+    # a legal move.
+    def slide_line_of(self, start_position, end_position):
+        (row, col), (end_row, end_col) = start_position, end_position
+        own, opponent = self.own_and_opponent()
+        if row == end_row:
+            vertical, index, end = False, col, end_col
+            code = line_code(self.row_line(own, row), self.row_line(opponent, row))
+        elif col == end_col:
+            vertical, index, end = True, row, end_row
+            code = line_code(
+                self.column_line(own, col), self.column_line(opponent, col)
+            )
+        else:
+            raise InvalidMove("You can only slide in one direction")
+
+        entry = line_moves_table(self.board_size)[code][index]
+        assert entry is not None
+        slide = entry[3][end]
+        if slide is None:
+            raise InvalidMove("Can not overboard your own piece")
+
+        result, valid = slide
+        if self.turn != self.PLAYER_WHITE:
+            result = swapped_codes(self.board_size)[result]
+        return vertical, result, valid
+
+    def slide_bitboards(self, start_position, vertical, result):
+        row, col = start_position
+        size = self.board_size
+        white_line, red_line = code_lines(size)[result]
+
+        if vertical:
+            line_mask = COLUMN_SPREAD[(1 << size) - 1] << col
+            white = COLUMN_SPREAD[white_line] << col
+            red = COLUMN_SPREAD[red_line] << col
+        else:
+            line_mask = ((1 << size) - 1) << (row * STRIDE)
+            white = white_line << (row * STRIDE)
+            red = red_line << (row * STRIDE)
+
+        return (self.white & ~line_mask) | white, (self.red & ~line_mask) | red
+
+    def get_preview_bitboards(self, start_position, end_position):
+        start_position = int(start_position[0]), int(start_position[1])
+        end_position = int(end_position[0]), int(end_position[1])
+
+        vertical, result, valid = self.slide_line_of(start_position, end_position)
+        white, red = self.slide_bitboards(start_position, vertical, result)
+        return white, red, valid
+
+    # Only the line of the move changes, so the preview is the current board
+    # with that line replaced.
+    def get_preview_board(self, start_position, end_position):
+        start_position = int(start_position[0]), int(start_position[1])
+        end_position = int(end_position[0]), int(end_position[1])
+
+        vertical, result, valid = self.slide_line_of(start_position, end_position)
+        board = self.board.copy()
+        line = line_transitions(self.board_size).lines[result]
+        if vertical:
+            board[:, start_position[1]] = line
+        else:
+            board[start_position[0]] = line
+        return board, valid
+
+    def make_move(self, start_position, end_position=None):
+        move = (
+            start_position
+            if end_position is None
+            else self.get_move(start_position, end_position)
+        )
+
+        self.history.append((move, self.white, self.red, self.hash))
+        if move.start != move.end:
+            vertical, result, _ = self.slide_line_of(move.start, move.end)
+            white, red = self.slide_bitboards(move.start, vertical, result)
+            self.toggle_hash(self.white ^ white, self.PLAYER_WHITE)
+            self.toggle_hash(self.red ^ red, self.PLAYER_RED)
+            self.white, self.red = white, red
+            self._board = None
+        self.hash ^= self.zobrist_turn
+
+        self.turn = (
+            self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
+        )
+
+        if self.debug:
+            self.check_counters()
+        return move
+
+    def unmake_move(self):
+        move, self.white, self.red, self.hash = self.history.pop()
+        self._board = None
+
+        self.turn = (
+            self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
+        )
+
+        if self.debug:
+            self.check_counters()
+        return move
+
+
+def compare_with_reference(board_size=8, positions=200, seed=0):
+    random.seed(seed)
+    reference = ReferenceOverboard(board_size)
+    bitboard = BitboardOverboard(board_size)
+
+    for _ in range(positions):
+        reference.initialize_randomly()
+        for _ in range(random.randint(0, 4 * board_size)):
+            if reference.get_winner() is not None:
+                break
+            piece, move, _ = random.choice(reference.get_moves())
+            reference.make_move(piece, move)
+
+        bitboard.initialize(reference.board.copy(), reference.turn)
+        expected = reference.get_moves()
+        actual = bitboard.get_moves()
+        assert [(tuple(map(int, p)), tuple(map(int, m))) for p, m, _ in expected] == [
+            (p, m) for p, m, _ in actual
+        ]
+        for (piece, move, preview), (_, _, actual_preview) in zip(expected, actual):
+            assert np.array_equal(preview, actual_preview)
+            expected_board, _ = reference.get_preview_board(piece, move)
+            actual_board, _ = bitboard.get_preview_board(piece, move)
+            assert np.array_equal(expected_board, actual_board)
+
+        moves = list(bitboard.iter_moves())
+        assert moves == list(reference.iter_moves())
+        assert [(m.start, m.end) for m in moves] == [(p, m) for p, m, _ in actual]
+        for move in moves:
+            expected_board, _ = reference.get_preview_board(move.start, move.end)
+            for overboard in [reference, bitboard]:
+                before = overboard.board.copy()
+                overboard.make_move(move)
+                assert np.array_equal(expected_board, overboard.board)
+                assert (
+                    overboard.hash
+                    == reference.from_numpy(expected_board, overboard.turn).hash
+                )
+                overboard.unmake_move()
+                assert np.array_equal(before, overboard.board)
+
+
+# Positions a few random moves into random games, fresh for every repeat so
+# that memoised line results (the slide cache of transitions.LineTransitions)
+# never get to serve a position twice.
+def random_positions(engine, board_size, positions):
+    reference = Overboard(board_size)
+    engines = []
+    for _ in range(positions):
+        reference.initialize_randomly()
+        for _ in range(random.randint(0, board_size)):
+            moves = list(reference.iter_moves())
+            if not moves or reference.get_winner() is not None:
+                break
+            reference.make_move(random.choice(moves))
+        engines.append(engine.from_numpy(reference.board.copy(), reference.turn))
+    return engines
+
+
+def moves_per_second(engine, board_size=8, positions=50, repeat=5, seed=0):
+    random.seed(seed)
+    best = 0
+    for _ in range(repeat):
+        engines = random_positions(engine, board_size, positions)
+        started = time.perf_counter()
+        moves = sum(1 for overboard in engines for _ in overboard.iter_moves())
+        best = max(best, moves / (time.perf_counter() - started))
+    return best
+
+
+def previews_per_second(engine, board_size=8, positions=50, repeat=5, seed=0):
+    random.seed(seed)
+    best = 0
+    for _ in range(repeat):
+        engines = random_positions(engine, board_size, positions)
+        moves = [(overboard, list(overboard.iter_moves())) for overboard in engines]
+        started = time.perf_counter()
+        previews = 0
+        for overboard, overboard_moves in moves:
+            for move in overboard_moves:
+                overboard.get_preview_board(move.start, move.end)
+            previews += len(overboard_moves)
+        best = max(best, previews / (time.perf_counter() - started))
+    return best
+
+
+def nodes_per_second(engine, board_size=8, positions=10, depth=3, seed=0):
+    from search import AlphaBetaSearch
+
+    random.seed(seed)
+    engines = random_positions(engine, board_size, positions)
+    nodes = 0
+    started = time.perf_counter()
+    for overboard in engines:
+        search = AlphaBetaSearch(max_depth=depth)
+        search.search(overboard)
+        nodes += search.stats["nodes"]
+    return nodes / (time.perf_counter() - started)
+
+
+# Every rate is measured on positions no engine has seen before, against
+# ReferenceOverboard, which simulates every slide, and the table driven
+# Overboard. The line tables of each board size are built before timing.
+if __name__ == "__main__":
+    compare_with_reference()
+    print("Bitboard move generation matches the reference implementation")
+
+    for size in [4, 6, 8]:
+        line_moves_table(size)
+        for name, rate in [
+            ("moves", moves_per_second),
+            ("previews", previews_per_second),
+            ("search nodes", nodes_per_second),
+        ]:
+            reference = rate(ReferenceOverboard, size)
+            tables = rate(Overboard, size)
+            bitboard = rate(BitboardOverboard, size)
+            print(
+                f"Board size {size} {name}/s: reference {reference:,.0f}, "
+                f"tables {tables:,.0f}, bitboard {bitboard:,.0f} "
+                f"({bitboard / reference:.1f}x reference, "
+                f"{bitboard / tables:.1f}x tables)"
+            )
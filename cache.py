@@ -0,0 +1,49 @@
+import os
+import numpy as np
+
+# Precomputed tables are saved once and memory-mapped by every later process,
+# so that process pool workers do not rebuild them on startup. Bump
+# CACHE_VERSION whenever the layout or contents of a table change; tables
+# of other versions live in other directories and are never read.
+CACHE_VERSION = 1
+
+CACHE_DIRECTORY = os.environ.get(
+    "OVERBOARD_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "overboard")
+)
+
+
+def cache_path(name):
+    return os.path.join(CACHE_DIRECTORY, f"v{CACHE_VERSION}", f"{name}.npy")
+
+
+def save_array(name, array):
+    path = cache_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written under another name first, so that processes starting at the
+    # same time never load a half-written table.
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        np.save(f, array)
+    os.replace(temporary, path)
+
+
+# Loads the named arrays of a table from the cache, or builds them with
+# build() and saves them when any is missing. Loaded arrays are read-only
+# memory maps, viewed as plain arrays since np.memmap indexes much slower. A
+# cache that cannot be written only costs building the table again.
+def load_tables(name, fields, build):
+    try:
+        return [
+            np.load(cache_path(f"{name}-{field}"), mmap_mode="r").view(np.ndarray)
+            for field in fields
+        ]
+    except (OSError, ValueError):
+        pass
+
+    tables = build()
+    try:
+        for field, table in zip(fields, tables):
+            save_array(f"{name}-{field}", table)
+    except OSError:
+        pass
+    return tables
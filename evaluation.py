@@ -0,0 +1,225 @@
+import abc
+import argparse
+import random
+from collections import OrderedDict
+import numpy as np
+from actions import gather_lines, line_tables
+from overboard import Overboard
+
+# Evaluators score positions from the side to move's point of view. They all
+# work on a batch of boards at once, shaped (batch, size, size), with the side
+# to move of each board in turns, so that search can score every child of a
+# frontier node in one NumPy call.
+
+
+class Evaluator(abc.ABC):
+    # Whether scoring boards together is cheaper than one at a time. When it
+    # is not, search scores leaves one by one with evaluate.
+    batched = True
+
+    @abc.abstractmethod
+    def evaluate_batch(self, boards, turns):
+        pass
+
+    def evaluate(self, overboard: Overboard):
+        return self.evaluate_batch(overboard.board[None], np.array([overboard.turn]))[0]
+
+    # keys are position hashes, only used by evaluators that cache.
+    def evaluate_many(self, boards, turns, keys):
+        return self.evaluate_batch(boards, turns)
+
+
+def own_and_opponent(boards, turns):
+    turns = np.asarray(turns)[:, None, None]
+    occupied = boards != Overboard.EMPTY
+    own = boards == turns
+    return own, occupied & ~own, occupied
+
+
+class MaterialEvaluator(Evaluator):
+    # The piece counts are tracked by the engine, so a single position is
+    # cheaper to score directly than through NumPy.
+    batched = False
+
+    def evaluate(self, overboard: Overboard):
+        score = overboard.get_piece_count(
+            Overboard.PLAYER_WHITE
+        ) - overboard.get_piece_count(Overboard.PLAYER_RED)
+        return score if overboard.turn == Overboard.PLAYER_WHITE else -score
+
+    def evaluate_batch(self, boards, turns):
+        own, opponent, _ = own_and_opponent(boards, turns)
+        return own.sum(axis=(1, 2)) - opponent.sum(axis=(1, 2))
+
+
+# Legal moves of the side to move minus those the opponent would have if it
+# were its turn.
+class MobilityEvaluator(Evaluator):
+    def evaluate_batch(self, boards, turns):
+        own, opponent, occupied = own_and_opponent(boards, turns)
+        counts = line_tables(boards.shape[-1]).counts
+        (own_moves,) = gather_lines(own, occupied, counts)
+        (opponent_moves,) = gather_lines(opponent, occupied, counts)
+        return own_moves.sum(axis=(1, 2, 3), dtype=np.int32) - opponent_moves.sum(
+            axis=(1, 2, 3), dtype=np.int32
+        )
+
+
+# Pieces in danger of going overboard: the most pieces the side to move can
+# push off with one move, minus the most the opponent could push off on its
+# next turn.
+class EdgeDangerEvaluator(Evaluator):
+    def evaluate_batch(self, boards, turns):
+        own, opponent, occupied = own_and_opponent(boards, turns)
+        tables = line_tables(boards.shape[-1])
+        threats = []
+        for pieces in [own, opponent]:
+            captures, counts = gather_lines(
+                pieces, occupied, tables.captures, tables.counts
+            )
+            captures = np.where(counts > 0, captures, 0)
+            threats.append(captures.max(axis=(1, 2, 3)).astype(np.int32))
+        return threats[0] - threats[1]
+
+
+# A weighted sum of other evaluators, with weights that can be fitted by
+# least squares, e.g. to game outcomes from the side to move's point of view.
+class LinearEvaluator(Evaluator):
+    def __init__(self, evaluators=None, weights=None):
+        self.evaluators = evaluators or [
+            MaterialEvaluator(),
+            MobilityEvaluator(),
+            EdgeDangerEvaluator(),
+        ]
+        self.weights = (
+            np.ones(len(self.evaluators))
+            if weights is None
+            else np.asarray(weights, dtype=float)
+        )
+
+    def features(self, boards, turns):
+        return np.stack(
+            [e.evaluate_batch(boards, turns) for e in self.evaluators], axis=1
+        ).astype(float)
+
+    def evaluate_batch(self, boards, turns):
+        return self.features(boards, turns) @ self.weights
+
+    def fit(self, boards, turns, targets):
+        self.weights, *_ = np.linalg.lstsq(
+            self.features(boards, turns), np.asarray(targets, dtype=float), rcond=None
+        )
+        return self.weights
+
+
+# Remembers the scores of the most recently used positions by Zobrist hash.
+# Only the positions missing from the cache are passed on to the wrapped
+# evaluator, still as one batch.
+class CachedEvaluator(Evaluator):
+    def __init__(self, evaluator, size=1 << 16):
+        self.evaluator = evaluator
+        self.size = size
+        self.batched = evaluator.batched
+        self.clear()
+
+    def clear(self):
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.cache.move_to_end(key)
+        return value
+
+    def remember(self, key, value):
+        self.cache[key] = value
+        if len(self.cache) > self.size:
+            self.cache.popitem(last=False)
+
+    def evaluate(self, overboard: Overboard):
+        value = self.lookup(overboard.hash)
+        if value is None:
+            value = self.evaluator.evaluate(overboard)
+            self.remember(overboard.hash, value)
+        return value
+
+    def evaluate_batch(self, boards, turns):
+        return self.evaluator.evaluate_batch(boards, turns)
+
+    def evaluate_many(self, boards, turns, keys):
+        values = [self.lookup(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            scores = self.evaluator.evaluate_batch(
+                boards[missing], np.asarray(turns)[missing]
+            )
+            for i, score in zip(missing, scores.tolist()):
+                values[i] = score
+                self.remember(keys[i], score)
+        return values
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Positions of greedy self-play games, with +1 for the side to move going
+# on to win, -1 for losing and 0 for unfinished games. A tenth of the moves
+# are random so that games do not all look alike.
+def self_play_positions(games, board_size=8, seed=0, exploration=0.1):
+    from min_max import greedy_move
+
+    random.seed(seed)
+    overboard = Overboard(board_size)
+    boards, turns, targets = [], [], []
+
+    for _ in range(games):
+        overboard.initialize_randomly()
+        game_boards, game_turns = [], []
+        while (winner := overboard.get_winner()) is None:
+            if len(game_boards) >= 2 * board_size**2:
+                winner = 0
+                break
+
+            game_boards.append(overboard.board.copy())
+            game_turns.append(overboard.turn)
+            if random.random() < exploration:
+                move = random.choice(list(overboard.iter_moves()))
+                overboard.make_move(move)
+            else:
+                overboard.make_move(*greedy_move(overboard))
+
+        boards.extend(game_boards)
+        turns.extend(game_turns)
+        targets.extend(
+            0 if winner == 0 else 1 if turn == winner else -1 for turn in game_turns
+        )
+
+    return np.array(boards, dtype=np.int8), np.array(turns), np.array(targets)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    boards, turns, targets = self_play_positions(args.games, args.board_size, args.seed)
+    evaluator = LinearEvaluator()
+    weights = evaluator.fit(boards, turns, targets)
+
+    names = [type(e).__name__ for e in evaluator.evaluators]
+    print(f"Fitted on {len(boards)} positions from {args.games} games")
+    for name, weight in zip(names, weights):
+        print(f"{name}: {weight:.4f}")
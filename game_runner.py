@@ -1,5 +1,6 @@
-from enum import Enum, auto
+import argparse
 import curses
+from enum import Enum, auto
 from overboard import Overboard
 
 
@@ -16,6 +17,93 @@ class Color(Enum):
         return background.value * 10 + foreground.value
 
 
+# Agents the TUI can play against or take hints from. The searches think for
+# the given number of seconds; the min_max.py agents take as long as they
+# take. Agents are only made in the worker, so the TUI itself never imports
+# the search modules.
+def make_agent(name, thinking_time):
+    if name == "alpha_beta":
+        from search import alpha_beta_agent
+
+        return alpha_beta_agent(max_depth=32, time_limit=thinking_time)
+    if name == "mcts":
+        from mcts import mcts_agent
+
+        return mcts_agent(iterations=None, time_limit=thinking_time)
+
+    from min_max import greedy_move, min_max_move, random_move
+
+    return {"random": random_move, "greedy": greedy_move, "min_max": min_max_move}[name]
+
+
+AGENTS = ["random", "greedy", "min_max", "alpha_beta", "mcts"]
+
+# Set once in the worker process, so agents keep their state (transposition
+# tables, search trees) from one move to the next.
+worker_state = {}
+
+
+def set_worker_state(agents, thinking_time, engine):
+    worker_state["agents"] = {
+        role: make_agent(name, thinking_time) for role, name in agents.items()
+    }
+    worker_state["engine"] = engine
+
+
+def worker_move(name, state):
+    overboard = worker_state["engine"](state.board_size)
+    overboard.set_state(state)
+    return worker_state["agents"][name](overboard)
+
+
+# Runs agents in a separate process so that searching never holds up input
+# or drawing. There is at most one request pending; a request for another
+# position replaces it. Searches cannot be interrupted, so a worker still
+# busy with a replaced request is killed and started again instead of
+# finishing a search nobody will look at.
+class EngineWorker:
+    # agents maps roles to the names of make_agent.
+    def __init__(self, agents, thinking_time, engine=Overboard):
+        self.initargs = (agents, thinking_time, engine)
+        self.start()
+        self.pending = None
+
+    def start(self):
+        import multiprocessing
+
+        self.pool = multiprocessing.Pool(1, set_worker_state, self.initargs)
+
+    def request(self, name, overboard: Overboard):
+        if self.pending is not None:
+            if self.pending[:2] == (name, overboard.hash):
+                return
+            if not self.pending[2].ready():
+                self.pool.terminate()
+                self.start()
+        result = self.pool.apply_async(worker_move, (name, overboard.get_state()))
+        self.pending = (name, overboard.hash, result)
+
+    # Returns the move for the position once it is ready, otherwise None.
+    def poll(self, name, overboard: Overboard):
+        if self.pending is None:
+            return None
+
+        pending_name, key, result = self.pending
+        if (pending_name, key) != (name, overboard.hash) or not result.ready():
+            return None
+
+        self.pending = None
+        return result.get()
+
+    def thinking(self, name):
+        return self.pending is not None and self.pending[0] == name
+
+    # Searches cannot be interrupted, so the worker is killed rather than
+    # waited for.
+    def close(self):
+        self.pool.terminate()
+
+
 class GameRunner:
     BLOCK_WIDTH = 7
     BLOCK_HEIGHT = 3
@@ -23,19 +111,79 @@ class GameRunner:
     SPACE = "\u0020"
     HORIZONTAL = f"\u2500"
     VERTICAL = f"\u2502"
-    PIECE = "\u25CB"
-    SELECTED_PIECE = "\u25CF"
-
-    def __init__(self, board_size=8):
-        self.overboard = Overboard(board_size)
+    PIECE = "\u25cb"
+    SELECTED_PIECE = "\u25cf"
+
+    def __init__(
+        self,
+        board_size=8,
+        engine=Overboard,
+        opponent=None,
+        engine_player=Overboard.PLAYER_RED,
+        hint=None,
+        thinking_time=1.0,
+    ):
+        self.overboard = engine(board_size)
         self.overboard.initialize_randomly()
         # self.overboard.initialize_test_board()
 
         self.cursor = (0, 0)
         self.selected_piece = None
 
+        # The opponent plays engine_player's moves; the hint agent suggests
+        # moves for the human players. Both run in the worker.
+        agents = {}
+        if opponent is not None:
+            agents["opponent"] = opponent
+        if hint is not None:
+            agents["hint"] = hint
+        self.engine_player = engine_player if opponent is not None else None
+        self.hint = hint
+        self.worker = EngineWorker(agents, thinking_time, engine) if agents else None
+        self.hint_move = None
+
+        # Rendered blocks by square state, and the state of every square as
+        # last drawn, so that a frame only redraws the squares that changed.
+        self.blocks = {}
+        self.invalidate()
+
+    # Forgets what is on the screen, e.g. after it was cleared or resized,
+    # so that the next frame draws everything.
+    def invalidate(self):
+        self.drawn = {}
+        self.drawn_layout = None
+
+    def is_engine_turn(self):
+        return self.overboard.turn == self.engine_player
+
+    # Called on every tick of the game loop to pick up moves the worker has
+    # finished. Returns whether anything changed.
+    def update(self):
+        if self.worker is None or self.overboard.get_winner() is not None:
+            return False
+
+        if self.is_engine_turn():
+            self.worker.request("opponent", self.overboard)
+            move = self.worker.poll("opponent", self.overboard)
+            if move is not None:
+                self.overboard.make_move(*move)
+                return True
+
+        hint_move = self.worker.poll("hint", self.overboard)
+        if hint_move is not None:
+            self.hint_move = (self.overboard.hash, hint_move)
+            return True
+
+        return False
+
     def handle_key_press(self, key):
-        if self.selected_piece == None:
+        if self.is_engine_turn():
+            return
+
+        if key == ord("h"):
+            if self.hint is not None:
+                self.worker.request("hint", self.overboard)
+        elif self.selected_piece == None:
             self.handle_piece_selection(key)
         else:
             self.handle_slide(key)
@@ -98,6 +246,15 @@ class GameRunner:
             else:
                 self.display_red_wins(stdscr)
 
+    def get_display_board(self):
+        if self.selected_piece is None:
+            return self.overboard.board
+
+        board, valid = self.overboard.get_preview_board(
+            self.selected_piece, self.cursor
+        )
+        return board
+
     def draw_board(self, stdscr):
         terminal_rows, terminal_cols = stdscr.getmaxyx()
         board_size = self.overboard.board_size
@@ -105,28 +262,57 @@ class GameRunner:
         starting_c = (terminal_cols - board_size * self.BLOCK_WIDTH) // 2
         starting_r = (terminal_rows - board_size * self.BLOCK_HEIGHT) // 2
 
-        self.display_turn_indicators(stdscr)
-
+        layout = (
+            terminal_rows,
+            terminal_cols,
+            self.overboard.turn,
+            self.player_label(Overboard.PLAYER_WHITE),
+            self.player_label(Overboard.PLAYER_RED),
+        )
+        if layout != self.drawn_layout:
+            if self.drawn_layout is None or self.drawn_layout[:2] != layout[:2]:
+                stdscr.erase()
+                self.drawn = {}
+            self.display_turn_indicators(stdscr)
+            self.drawn_layout = layout
+
+        # The preview is the same for every square, so it is computed once
+        # per frame rather than once per block.
+        board = self.get_display_board()
         for r in range(board_size):
             for c in range(board_size):
-                block = self.get_block(r, c)
-                for b_r in range(self.BLOCK_HEIGHT):
-                    for b_c in range(self.BLOCK_WIDTH):
-                        block_char = block[b_r][b_c][0]
-                        block_color = block[b_r][b_c][1]
+                state = self.get_square_state(board, r, c)
+                if self.drawn.get((r, c)) == state:
+                    continue
+
+                for b_r, runs in enumerate(self.get_block(state)):
+                    x = starting_c + c * self.BLOCK_WIDTH
+                    for text, color in runs:
                         stdscr.addstr(
                             starting_r + r * self.BLOCK_HEIGHT + b_r,
-                            starting_c + c * self.BLOCK_WIDTH + b_c,
-                            block_char,
-                            curses.color_pair(block_color),
+                            x,
+                            text,
+                            curses.color_pair(color),
                         )
-
+                        x += len(text)
+                self.drawn[r, c] = state
+
+    def player_label(self, player):
+        label = "WHITE" if player == Overboard.PLAYER_WHITE else "RED"
+        if player == self.engine_player:
+            label += " (engine)"
+        if player == self.overboard.turn and self.worker is not None:
+            if self.worker.thinking("opponent"):
+                label += " - thinking..."
+            elif self.worker.thinking("hint"):
+                label += " - looking for a hint..."
+        return label
+
+    # Labels are cut to the width of the board, and their lines are cleared
+    # first, so a shorter label leaves nothing of the one it replaces.
     def display_turn_indicators(self, stdscr):
         terminal_rows, terminal_cols = stdscr.getmaxyx()
 
-        white = "WHITE"
-        red = "RED"
-
         board_width = self.BLOCK_WIDTH * self.overboard.board_size
         board_height = self.BLOCK_HEIGHT * self.overboard.board_size
         starting_x = (terminal_cols - board_width) // 2
@@ -134,26 +320,22 @@ class GameRunner:
         turn_color = curses.color_pair(Color.get(Color.BLUE, Color.WHITE))
         non_turn_color = curses.color_pair(Color.get(Color.WHITE, Color.BLUE))
 
-        stdscr.addstr(
-            (terminal_rows - board_height) // 2 - 2,
-            starting_x,
-            f" {white}{' ' * (board_width - len(white) - 1)}",
+        for player, y in [
+            (Overboard.PLAYER_WHITE, (terminal_rows - board_height) // 2 - 2),
             (
-                turn_color
-                if self.overboard.turn == Overboard.PLAYER_WHITE
-                else non_turn_color
+                Overboard.PLAYER_RED,
+                (terminal_rows - board_height) // 2 + board_height + 1,
             ),
-        )
-        stdscr.addstr(
-            (terminal_rows - board_height) // 2 + board_height + 1,
-            starting_x,
-            f" {red}{' ' * (board_width - len(red) - 1)}",
-            (
-                turn_color
-                if self.overboard.turn == Overboard.PLAYER_RED
-                else non_turn_color
-            ),
-        )
+        ]:
+            label = f" {self.player_label(player)}"[:board_width]
+            stdscr.move(y, 0)
+            stdscr.clrtoeol()
+            stdscr.addstr(
+                y,
+                starting_x,
+                label.ljust(board_width),
+                turn_color if self.overboard.turn == player else non_turn_color,
+            )
 
     def display_white_wins(self, stdscr):
         banner = r"""
@@ -204,47 +386,50 @@ class GameRunner:
                 curses.color_pair(color),
             )
 
-    def get_block(self, row, col):
-        board = self.overboard.board
-        if self.selected_piece is not None:
-            board, valid = self.overboard.get_preview_board(
-                self.selected_piece, self.cursor
-            )
-
-        piece = board[row, col]
+    def get_square_state(self, board, row, col):
         background = Color.BLUE
         if self.selected_piece is not None and (
             row == self.selected_piece[0] or col == self.selected_piece[1]
         ):
             background = Color.CYAN
 
+        if self.hint_move is not None and self.hint_move[0] == self.overboard.hash:
+            if (row, col) in self.hint_move[1]:
+                background = Color.GREEN
+
         if row == self.cursor[0] and col == self.cursor[1]:
             background = Color.YELLOW
 
-        block = [
-            [
-                (self.SPACE, Color.get(background, background))
-                for _ in range(self.BLOCK_WIDTH)
-            ]
-            for _ in range(self.BLOCK_HEIGHT)
-        ]
         piece_char = (
             self.SELECTED_PIECE
             if self.selected_piece is not None and (row, col) == self.cursor
             else self.PIECE
         )
+        return int(board[row, col]), background, piece_char
+
+    # A block is a list of rows, each a list of (text, color) runs, so that
+    # drawing it takes one addstr per run instead of one per character.
+    def get_block(self, state):
+        if state in self.blocks:
+            return self.blocks[state]
+
+        piece, background, piece_char = state
+        empty = (self.SPACE * self.BLOCK_WIDTH, Color.get(background, background))
+        block = [[empty] for _ in range(self.BLOCK_HEIGHT)]
+
+        if piece != Overboard.EMPTY:
+            foreground = Color.RED if piece == Overboard.PLAYER_RED else Color.WHITE
+            left = self.BLOCK_WIDTH // 2
+            block[self.BLOCK_HEIGHT // 2] = [
+                (self.SPACE * left, Color.get(background, background)),
+                (piece_char, Color.get(foreground, background)),
+                (
+                    self.SPACE * (self.BLOCK_WIDTH - left - 1),
+                    Color.get(background, background),
+                ),
+            ]
 
-        if piece == Overboard.PLAYER_RED:
-            block[self.BLOCK_HEIGHT // 2][self.BLOCK_WIDTH // 2] = (
-                piece_char,
-                Color.get(Color.RED, background),
-            )
-        elif piece == Overboard.PLAYER_WHITE:
-            block[self.BLOCK_HEIGHT // 2][self.BLOCK_WIDTH // 2] = (
-                piece_char,
-                Color.get(Color.WHITE, background),
-            )
-
+        self.blocks[state] = block
         return block
 
 
@@ -285,6 +470,12 @@ def setup_curses_colors():
     )
 
     # Green Background
+    curses.init_pair(
+        Color.get(Color.GREEN, Color.GREEN), curses.COLOR_GREEN, curses.COLOR_GREEN
+    )
+    curses.init_pair(
+        Color.get(Color.RED, Color.GREEN), curses.COLOR_RED, curses.COLOR_GREEN
+    )
     curses.init_pair(
         Color.get(Color.WHITE, Color.GREEN), curses.COLOR_WHITE, curses.COLOR_GREEN
     )
@@ -295,25 +486,58 @@ def setup_curses_colors():
     )
 
 
-def game_loop(stdscr):
+def game_loop(stdscr, args):
     setup_curses_colors()
 
-    game_runner = GameRunner(8)
+    game_runner = GameRunner(
+        args.board_size,
+        opponent=args.opponent,
+        engine_player=(
+            Overboard.PLAYER_WHITE
+            if args.engine_plays == "white"
+            else Overboard.PLAYER_RED
+        ),
+        hint=args.hint,
+        thinking_time=args.thinking_time,
+    )
 
-    stdscr.nodelay(False)
+    # With an engine, getch gives up after a tenth of a second so that the
+    # loop can pick up moves from the worker while waiting for keys.
+    if game_runner.worker is None:
+        stdscr.nodelay(False)
+    else:
+        stdscr.timeout(100)
     curses.curs_set(0)
 
-    while True:
-        stdscr.clear()
-        game_runner.render(stdscr)
-        stdscr.refresh()
-
-        key = stdscr.getch()
-        if key == ord("q"):
-            break
-        else:
-            game_runner.handle_key_press(key)
+    # The screen is never cleared between frames: render only touches the
+    # squares that changed, and curses sends only the characters that differ
+    # from what the terminal already shows.
+    try:
+        while True:
+            game_runner.update()
+            game_runner.render(stdscr)
+            stdscr.noutrefresh()
+            curses.doupdate()
+
+            key = stdscr.getch()
+            if key == ord("q"):
+                break
+            elif key == curses.KEY_RESIZE:
+                game_runner.invalidate()
+            elif key != -1:
+                game_runner.handle_key_press(key)
+    finally:
+        if game_runner.worker is not None:
+            game_runner.worker.close()
 
 
 if __name__ == "__main__":
-    curses.wrapper(game_loop)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--opponent", choices=AGENTS, default=None)
+    parser.add_argument("--engine-plays", choices=["white", "red"], default="red")
+    parser.add_argument("--hint", choices=AGENTS, default=None)
+    parser.add_argument("--thinking-time", type=float, default=1.0)
+    args = parser.parse_args()
+
+    curses.wrapper(game_loop, args)
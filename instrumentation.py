@@ -0,0 +1,280 @@
+import functools
+import json
+import time
+from collections import Counter, defaultdict
+from overboard import Overboard
+
+# Engine methods timed by default: move generation (alpha-beta generates
+# captures and quiet moves separately and checks remembered quiet moves with
+# is_legal_quiet_move), previews, making and taking back moves, and the
+# winner and piece count checks search uses for evaluation. Timers are
+# inclusive, so make_move also holds the get_move time it spends validating
+# (start, end) pairs.
+INSTRUMENTED_METHODS = [
+    "iter_moves",
+    "iter_captures",
+    "iter_quiet_moves",
+    "is_legal_quiet_move",
+    "get_moves",
+    "get_preview_board",
+    "make_move",
+    "unmake_move",
+    "get_winner",
+    "get_piece_count",
+]
+
+GENERATOR_METHODS = {"iter_moves", "iter_captures", "iter_quiet_moves"}
+
+# Evaluator methods timed for agents that search with an evaluator.
+EVALUATOR_METHODS = ["evaluate", "evaluate_many"]
+
+MISSING = object()
+
+
+# Counts calls and time spent in the methods of one engine by replacing them
+# on that instance only. Nothing is replaced unless instrument is called, so
+# code that is not being profiled pays nothing. Counters are kept per move
+# decision (between begin_move and end_move) and per game.
+class Profiler:
+    def __init__(self):
+        self.counters = Counter()
+        self.timers = defaultdict(float)
+        self.games = []
+        self.moves = []
+        self.overboard = None
+        self.searching = False
+        self.replaced = []
+
+    def wrap(self, name, method):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.timers[name] += time.perf_counter() - started
+                self.counters[name] += 1
+
+        return timed
+
+    # Generators are timed while they produce items, not while the caller
+    # works on them, and also count the items they produce.
+    def wrap_generator(self, name, method):
+        def timed(*args, **kwargs):
+            self.counters[name] += 1
+            started = time.perf_counter()
+            for item in method(*args, **kwargs):
+                self.timers[name] += time.perf_counter() - started
+                self.counters[f"{name}.items"] += 1
+                yield item
+                started = time.perf_counter()
+            self.timers[name] += time.perf_counter() - started
+
+        return timed
+
+    def wrap_make_move(self, method):
+        timed = self.wrap("make_move", method)
+
+        def make_move(*args, **kwargs):
+            if self.searching:
+                ply = len(self.overboard.history) - self.root_ply
+                self.counters[f"nodes.ply{ply + 1}"] += 1
+            return timed(*args, **kwargs)
+
+        return make_move
+
+    def instrument(self, overboard: Overboard, methods=INSTRUMENTED_METHODS):
+        self.overboard = overboard
+        self.root_ply = len(overboard.history)
+        for name in methods:
+            method = getattr(overboard, name)
+            if name == "make_move":
+                wrapped = self.wrap_make_move(method)
+            elif name in GENERATOR_METHODS:
+                wrapped = self.wrap_generator(name, method)
+            else:
+                wrapped = self.wrap(name, method)
+            setattr(overboard, name, wrapped)
+        return overboard
+
+    # Agents are partials of a move function and a search object (see
+    # search.alpha_beta_agent). Searches with an evaluator have its methods
+    # timed, and the iterations of searches that report them (like
+    # AlphaBetaSearch) are added up per depth. Agents may share a search or
+    # an evaluator, which is only instrumented once. Unlike the engine,
+    # agents outlive the game, so restore puts their methods back.
+    def instrument_agent(self, agent):
+        search = (
+            agent.args[0]
+            if isinstance(agent, functools.partial) and agent.args
+            else None
+        )
+        if search is None:
+            return agent
+
+        evaluator = getattr(search, "evaluator", None)
+        if evaluator is not None:
+            for name in EVALUATOR_METHODS:
+                self.replace(evaluator, name, functools.partial(self.wrap, name))
+        if hasattr(search, "search"):
+            self.replace(search, "search", self.wrap_search)
+        return agent
+
+    # Replaces obj.name with wrap(obj.name) on the instance, unless this
+    # profiler already has. The attribute the instance had, if any, is
+    # remembered so restore can put it back.
+    def replace(self, obj, name, wrap):
+        if any(o is obj and n == name for o, n, _, _ in self.replaced):
+            return
+        previous = vars(obj).get(name, MISSING)
+        wrapped = wrap(getattr(obj, name))
+        setattr(obj, name, wrapped)
+        self.replaced.append((obj, name, previous, wrapped))
+
+    # Only attributes that still hold the wrappers set here are touched, so
+    # restoring twice, or after someone else replaced them, is harmless.
+    def restore(self):
+        for obj, name, previous, wrapped in reversed(self.replaced):
+            if vars(obj).get(name) is not wrapped:
+                continue
+            if previous is MISSING:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+        self.replaced = []
+
+    # Iteration times are reported since the start of the search, so each
+    # depth gets the difference from the one before.
+    def wrap_search(self, method):
+        def search(*args, **kwargs):
+            result = method(*args, **kwargs)
+            elapsed = 0.0
+            for iteration in result.stats.get("iterations", []):
+                depth = iteration["depth"]
+                self.counters[f"depth.{depth}.searches"] += 1
+                self.counters[f"depth.{depth}.nodes"] += iteration["nodes"]
+                self.timers[f"depth.{depth}"] += iteration["time"] - elapsed
+                elapsed = iteration["time"]
+            return result
+
+        return search
+
+    def snapshot(self):
+        return Counter(self.counters), dict(self.timers), time.perf_counter()
+
+    def begin_move(self):
+        self.root_ply = len(self.overboard.history)
+        self.searching = True
+        self.move_start = self.snapshot()
+
+    def end_move(self, player):
+        self.searching = False
+        counters, timers, started = self.move_start
+        summary = self.summarize(
+            self.counters - counters,
+            {name: self.timers[name] - timers.get(name, 0.0) for name in self.timers},
+            time.perf_counter() - started,
+        )
+        summary["player"] = player
+        self.moves.append(summary)
+
+    def begin_game(self):
+        self.moves = []
+        self.game_start = self.snapshot()
+
+    def end_game(self, winner, length):
+        counters, timers, started = self.game_start
+        summary = self.summarize(
+            self.counters - counters,
+            {name: self.timers[name] - timers.get(name, 0.0) for name in self.timers},
+            time.perf_counter() - started,
+        )
+        summary.update(winner=winner, length=length, moves=self.moves)
+        self.games.append(summary)
+        self.restore()
+        return summary
+
+    # Nodes per ply are the moves made that many plies below the position
+    # being decided, counted only while an agent decides. The branching
+    # factor is the average number of moves generated per position, by
+    # iter_moves or by iter_captures and iter_quiet_moves together. Staged
+    # generation skips the quiet moves of positions cut off by a capture, so
+    # for alpha-beta this is lower than the number of legal moves.
+    # Iterations by depth are the iterative deepening rounds of the agents'
+    # searches, with the nodes and time each depth took.
+    @staticmethod
+    def summarize(counters, timers, elapsed):
+        nodes_by_ply = []
+        while f"nodes.ply{len(nodes_by_ply) + 1}" in counters:
+            nodes_by_ply.append(counters[f"nodes.ply{len(nodes_by_ply) + 1}"])
+
+        iterations_by_depth = []
+        while f"depth.{len(iterations_by_depth) + 1}.searches" in counters:
+            depth = len(iterations_by_depth) + 1
+            iterations_by_depth.append(
+                {
+                    "depth": depth,
+                    "searches": counters[f"depth.{depth}.searches"],
+                    "nodes": counters[f"depth.{depth}.nodes"],
+                    "time": timers[f"depth.{depth}"],
+                }
+            )
+
+        positions = counters["iter_moves"] + counters["iter_captures"]
+        generated = sum(
+            counters[f"{name}.items"]
+            for name in ["iter_moves", "iter_captures", "iter_quiet_moves"]
+        )
+        return {
+            "time": elapsed,
+            "nodes": sum(nodes_by_ply),
+            "nodes_by_ply": nodes_by_ply,
+            "branching_factor": generated / positions if positions else None,
+            "iterations_by_depth": iterations_by_depth,
+            "calls": {
+                name: count for name, count in counters.items() if "." not in name
+            },
+            "timers": {
+                name: seconds
+                for name, seconds in timers.items()
+                if seconds and "." not in name
+            },
+        }
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump({"games": self.games}, f, indent=2)
+
+
+# Profiles an alpha-beta game and checks that move generation, through
+# iter_captures and iter_quiet_moves, evaluation and every depth of the
+# searches show up in the summaries, and that the agent is left as it was.
+def check_profiler(board_size=4, seed=0, max_depth=2):
+    from evaluation import LinearEvaluator
+    from min_max import greedy_move
+    from search import alpha_beta_agent
+    from tournament import play_game
+
+    agent = alpha_beta_agent(max_depth=max_depth, evaluator=LinearEvaluator())
+    _, _, game = play_game(agent, greedy_move, seed, board_size, profile=True)
+    searches = [move for move in game["moves"] if move["nodes"]]
+    assert searches
+    for summary in [game] + searches:
+        assert summary["branching_factor"] is not None
+        assert summary["timers"]["iter_captures"] > 0
+        assert summary["calls"]["iter_captures"] > 0
+        assert summary["calls"]["evaluate_many"] > 0
+        assert summary["timers"]["evaluate_many"] > 0
+        assert [i["depth"] for i in summary["iterations_by_depth"]] == list(
+            range(1, len(summary["iterations_by_depth"]) + 1)
+        )
+    assert len(game["iterations_by_depth"]) == max_depth
+    assert game["iterations_by_depth"][0]["searches"] == len(searches)
+
+    search = agent.args[0]
+    assert "search" not in vars(search)
+    assert not vars(search.evaluator).keys() & set(EVALUATOR_METHODS)
+
+
+if __name__ == "__main__":
+    check_profiler()
+    print("Profiles of alpha-beta games include generation, evaluation and depths")
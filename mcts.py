@@ -0,0 +1,247 @@
+import functools
+import math
+import random
+import time
+from overboard import Move, Overboard
+from search import SearchResult
+
+DIRECTIONS = [(0, -1), (0, +1), (-1, 0), (+1, 0)]
+
+
+class MCTSNode:
+    def __init__(self, move, player, hash):
+        self.move = move
+        # The player who made the move leading here; rewards are counted
+        # from their point of view so parents can pick the best child.
+        self.player = player
+        self.hash = hash
+        self.children = []
+        self.untried_moves = None
+        self.visits = 0
+        self.reward = 0.0
+
+    def uct_child(self, exploration):
+        log_visits = math.log(self.visits)
+        return max(
+            self.children,
+            key=lambda child: child.reward / child.visits
+            + exploration * math.sqrt(log_visits / child.visits),
+        )
+
+    def most_visited_child(self):
+        return max(self.children, key=lambda child: child.visits)
+
+    def size(self):
+        return 1 + sum(child.size() for child in self.children)
+
+
+def opponent(player):
+    if player == Overboard.PLAYER_RED:
+        return Overboard.PLAYER_WHITE
+    return Overboard.PLAYER_RED
+
+
+# Samples a few random (piece, direction) pairs and plays the one that
+# pushes off the most pieces, or a random slide of the first legal pair when
+# none captures. Playouts need neither uniform nor exhaustive choices, and
+# this costs a handful of line lookups instead of a full move generation
+# while still making playouts punish hanging pieces.
+def playout_move(overboard: Overboard, pieces, samples=8):
+    best, best_captures = None, -1
+    for _ in range(samples):
+        r, c = random.choice(pieces)
+        direction = random.choice(DIRECTIONS)
+        if direction[0]:
+            line, index = overboard.get_line((r, c), (1, 0)), r
+        else:
+            line, index = overboard.get_line((r, c), (0, 1)), c
+
+        first_capture, last_step = overboard.get_line_reach(line, index, sum(direction))
+        captures = last_step - first_capture + 1
+        if captures > best_captures and (captures or first_capture > 1):
+            if captures:
+                step = last_step
+            else:
+                step = 1
+            best, best_captures = (
+                Move(
+                    (r, c),
+                    (r + step * direction[0], c + step * direction[1]),
+                    direction,
+                    captures,
+                ),
+                captures,
+            )
+
+    if best is None:
+        return random.choice(list(overboard.iter_moves()))
+    return best
+
+
+class MCTS:
+    def __init__(
+        self,
+        iterations=1000,
+        time_limit=None,
+        exploration=0.7,
+        reuse_tree=True,
+        playout_limit=None,
+    ):
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.reuse_tree = reuse_tree
+        self.playout_limit = playout_limit
+        self.root = None
+
+    # The tree kept from the previous search is reused when the position is
+    # its root (the same agent playing both sides) or one of the root's
+    # children (the opponent replied with a move we already explored).
+    def get_root(self, overboard: Overboard):
+        if self.reuse_tree and self.root is not None:
+            if self.root.hash == overboard.hash:
+                return self.root
+            for child in self.root.children:
+                if child.hash == overboard.hash:
+                    return child
+
+        return MCTSNode(None, opponent(overboard.turn), overboard.hash)
+
+    # Values are the expected score for white, 1 for a win and 0.5 for a
+    # draw, so they read the same no matter whose turn it is.
+    def search(self, overboard: Overboard):
+        started = time.perf_counter()
+        deadline = None if self.time_limit is None else started + self.time_limit
+
+        root = self.get_root(overboard)
+        reused = root.visits
+        self.stats = {"iterations": 0, "depth": 0, "reused": reused}
+
+        while (
+            self.iterations is None or self.stats["iterations"] < self.iterations
+        ) and (deadline is None or time.perf_counter() < deadline):
+            self.iterate(overboard, root)
+            self.stats["iterations"] += 1
+
+        self.stats["time"] = time.perf_counter() - started
+        self.stats["iterations_per_second"] = (
+            self.stats["iterations"] / self.stats["time"]
+        )
+        self.stats["nodes"] = root.size()
+
+        if not root.children:
+            self.root = None
+            return SearchResult(None, None, 0, [], self.stats)
+
+        principal_variation = []
+        node = root
+        while node.children:
+            node = node.most_visited_child()
+            principal_variation.append(node.move)
+
+        best = root.most_visited_child()
+        value = best.reward / best.visits
+        if best.player != Overboard.PLAYER_WHITE:
+            value = 1 - value
+
+        self.root = best
+        return SearchResult(
+            best.move,
+            value,
+            len(principal_variation),
+            principal_variation,
+            self.stats,
+        )
+
+    def iterate(self, overboard: Overboard, root: MCTSNode):
+        path = [root]
+        node = root
+
+        while node.untried_moves is not None and not node.untried_moves:
+            if not node.children:
+                break
+            node = node.uct_child(self.exploration)
+            overboard.make_move(node.move)
+            path.append(node)
+
+        # Children are expanded captures first, so that even a search with
+        # fewer iterations than root moves looks at the strongest ones.
+        if node.untried_moves is None:
+            node.untried_moves = (
+                sorted(overboard.iter_moves(), key=lambda move: move.captures)
+                if overboard.get_winner() is None
+                else []
+            )
+
+        if node.untried_moves:
+            move = node.untried_moves.pop()
+
+            player = overboard.turn
+            overboard.make_move(move)
+            node = MCTSNode(move, player, overboard.hash)
+            path[-1].children.append(node)
+            path.append(node)
+
+        winner = self.playout(overboard)
+        self.stats["depth"] = max(self.stats["depth"], len(path) - 1)
+
+        for node in path:
+            node.visits += 1
+            if winner == node.player:
+                node.reward += 1
+            elif winner == 0:
+                node.reward += 0.5
+
+        for _ in range(len(path) - 1):
+            overboard.unmake_move()
+
+    # Plays fast moves in place and takes them back afterwards. Returns the
+    # winner; a playout that runs past the limit goes to the side with more
+    # pieces left, or is a draw (0) when they are level. Short playouts
+    # scored by material are much less noisy than random games played out
+    # to the end, so the limit defaults to one move per row.
+    def playout(self, overboard: Overboard):
+        limit = self.playout_limit or overboard.board_size
+        moves = 0
+
+        while (winner := overboard.get_winner()) is None:
+            if moves == limit:
+                white = overboard.get_piece_count(Overboard.PLAYER_WHITE)
+                red = overboard.get_piece_count(Overboard.PLAYER_RED)
+                if white != red:
+                    winner = (
+                        Overboard.PLAYER_WHITE if white > red else Overboard.PLAYER_RED
+                    )
+                else:
+                    winner = 0
+                break
+
+            overboard.make_move(
+                playout_move(overboard, overboard.get_player_piece_positions())
+            )
+            moves += 1
+
+        for _ in range(moves):
+            overboard.unmake_move()
+
+        return winner
+
+
+def mcts_move(search: MCTS, overboard: Overboard):
+    move = search.search(overboard).move
+    return (move.start, move.end)
+
+
+# Like alpha_beta_agent, a partial of a module-level function so tournament
+# workers can pickle it.
+def mcts_agent(
+    iterations=1000,
+    time_limit=None,
+    exploration=0.7,
+    reuse_tree=True,
+    playout_limit=None,
+):
+    return functools.partial(
+        mcts_move,
+        MCTS(iterations, time_limit, exploration, reuse_tree, playout_limit),
+    )
@@ -1,14 +1,15 @@
 import random
-import numpy as np
-from tqdm import tqdm
-import timeit
 from overboard import Overboard
 
 SIZE = 4
 
 
-def play_tournament(white_move, red_move):
-    overboard = Overboard(board_size=SIZE)
+# tqdm is only imported here, so that importing the agents stays cheap for
+# the TUI and for tournament workers.
+def play_tournament(white_move, red_move, engine=Overboard):
+    from tqdm import tqdm
+
+    overboard = engine(board_size=SIZE)
 
     average_game_length = 0
     wins = {Overboard.PLAYER_WHITE: 0, Overboard.PLAYER_RED: 0, 0: 0}
@@ -42,34 +43,18 @@ def play_tournament(white_move, red_move):
 
 
 def random_move(overboard: Overboard):
-    piece, move, _ = random.choice(overboard.get_moves())
-    return (piece, move)
+    move = random.choice(list(overboard.iter_moves()))
+    return (move.start, move.end)
 
 
 def greedy_move(overboard: Overboard):
     greedy_move_value = -1
     greedy_move = None
 
-    current_board = overboard.board
-    opponent_piece = (
-        Overboard.PLAYER_WHITE
-        if overboard.turn == Overboard.PLAYER_RED
-        else Overboard.PLAYER_RED
-    )
-
-    for piece, move, preview in overboard.get_moves():
-        line = (
-            current_board[piece[0], :]
-            if piece[0] == move[0]
-            else current_board[:, piece[1]]
-        )
-        before = np.sum(line == opponent_piece)
-        after = np.sum(preview == opponent_piece)
-        score = before - after
-
-        if score > greedy_move_value:
-            greedy_move_value = score
-            greedy_move = (piece, move)
+    for move in overboard.iter_moves():
+        if move.captures > greedy_move_value:
+            greedy_move_value = move.captures
+            greedy_move = (move.start, move.end)
 
     return greedy_move
 
@@ -79,29 +64,27 @@ def min_max_move(overboard: Overboard):
         best_move_value = -1000
         best_move = None
 
-        for piece, move, _ in overboard.get_moves():
-            preview, _ = overboard.get_preview_board(piece, move)
-            eval = min_max(
-                Overboard.from_numpy(preview, Overboard.PLAYER_RED), False, 2
-            )
+        for move in overboard.iter_moves():
+            overboard.make_move(move)
+            eval = min_max(overboard, False, 2)
+            overboard.unmake_move()
 
             if eval > best_move_value:
                 best_move_value = eval
-                best_move = (piece, move)
+                best_move = (move.start, move.end)
 
     else:
         best_move_value = 1000
         best_move = None
 
-        for piece, move, _ in overboard.get_moves():
-            preview, _ = overboard.get_preview_board(piece, move)
-            eval = min_max(
-                Overboard.from_numpy(preview, Overboard.PLAYER_WHITE), True, 2
-            )
+        for move in overboard.iter_moves():
+            overboard.make_move(move)
+            eval = min_max(overboard, True, 2)
+            overboard.unmake_move()
 
             if eval < best_move_value:
                 best_move_value = eval
-                best_move = (piece, move)
+                best_move = (move.start, move.end)
 
     return best_move
 
@@ -117,34 +100,30 @@ def min_max(overboard: Overboard, maximizing_player, depth=3):
         return -999
 
     if depth == 0:
-        white_score = np.sum(overboard.board == Overboard.PLAYER_WHITE)
-        red_score = np.sum(overboard.board == Overboard.PLAYER_RED)
+        white_score = overboard.get_piece_count(Overboard.PLAYER_WHITE)
+        red_score = overboard.get_piece_count(Overboard.PLAYER_RED)
         return white_score - red_score
 
-    moves = overboard.get_moves()
-
     if maximizing_player:
         max_eval = -1000
-        for piece, move, _ in moves:
-            child, _ = overboard.get_preview_board(piece, move)
-            eval = min_max(
-                Overboard.from_numpy(child, Overboard.PLAYER_RED), False, depth - 1
-            )
+        for move in overboard.iter_moves():
+            overboard.make_move(move)
+            eval = min_max(overboard, False, depth - 1)
+            overboard.unmake_move()
             max_eval = max(max_eval, eval)
         return max_eval
 
     else:
         min_eval = +1000
-        for piece, move, _ in moves:
-            child, _ = overboard.get_preview_board(piece, move)
-            eval = min_max(
-                Overboard.from_numpy(child, Overboard.PLAYER_WHITE), True, depth - 1
-            )
+        for move in overboard.iter_moves():
+            overboard.make_move(move)
+            eval = min_max(overboard, True, depth - 1)
+            overboard.unmake_move()
             min_eval = min(min_eval, eval)
         return min_eval
 
 
-def run_experiments():
+def run_experiments(engine=Overboard):
     random.seed(12)
 
     agents = {
@@ -156,9 +135,11 @@ def run_experiments():
     for name_w, function_w in agents.items():
         for name_r, function_r in agents.items():
             print(f"White: {name_w} - Red: {name_r}")
-            play_tournament(function_w, function_r)
+            play_tournament(function_w, function_r, engine)
 
 
 if __name__ == "__main__":
+    import timeit
+
     execution_time = timeit.timeit(run_experiments, number=10)
     print(f"Average time per run: {execution_time / 10:.6f} seconds")
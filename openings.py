@@ -0,0 +1,230 @@
+import argparse
+import functools
+import random
+import time
+from collections import defaultdict
+import numpy as np
+from actions import action_to_move, move_to_action
+from min_max import min_max_move
+from overboard import Overboard
+from perft import load_position, standard_positions
+from search import AlphaBetaSearch
+
+# One row per (position, move) seen while building the book. Positions are
+# keyed by Zobrist hash, which includes the side to move and is the same in
+# every process. games and score count the self-play games that played the
+# move, score from the mover's point of view (+1 win, -1 loss, 0 draw);
+# positions played often enough are also searched to depth, which gives
+# one row with the best move and its value for the side to move.
+BOOK_DTYPE = np.dtype(
+    [
+        ("key", np.uint64),
+        ("action", np.int32),
+        ("games", np.int32),
+        ("score", np.float32),
+        ("value", np.float32),
+        ("depth", np.int8),
+    ]
+)
+
+
+class OpeningBook:
+    def __init__(self, board_size, entries=None, min_games=4):
+        self.board_size = board_size
+        self.entries = (
+            np.zeros(0, dtype=BOOK_DTYPE) if entries is None else np.asarray(entries)
+        )
+        self.min_games = min_games
+        self.moves = self.choose_moves()
+
+    # The move to play in every position of the book, so that probing is a
+    # single dict lookup. Searched moves come first, deepest search first;
+    # otherwise the move that scored best in self-play, among moves played
+    # at least min_games times.
+    def choose_moves(self):
+        moves, ranks = {}, {}
+        for key, action, games, score, value, depth in self.entries.tolist():
+            if depth > 0:
+                rank = (1, depth, value)
+            elif games >= self.min_games:
+                rank = (0, score / games, games)
+            else:
+                continue
+
+            if key not in ranks or rank > ranks[key]:
+                ranks[key] = rank
+                moves[key] = action_to_move(action, self.board_size)
+        return moves
+
+    def __len__(self):
+        return len(self.moves)
+
+    # Returns the book move as a (start, end) pair, or None when the
+    # position is not in the book.
+    def probe(self, overboard: Overboard):
+        return self.moves.get(overboard.hash)
+
+    def save(self, path):
+        np.savez(path, board_size=self.board_size, entries=self.entries)
+
+    @staticmethod
+    def load(path, min_games=4):
+        data = np.load(path)
+        return OpeningBook(int(data["board_size"]), data["entries"], min_games)
+
+
+# Plays one game from the given position, greedy except for a share of
+# random moves so that games branch out, and returns the (key, action,
+# turn) of its first plies moves with the winner.
+def play_book_game(overboard: Overboard, plies, exploration, rng):
+    opening = []
+    length = 0
+    while (winner := overboard.get_winner()) is None:
+        if length >= 2 * overboard.board_size**2:
+            winner = 0
+            break
+
+        moves = list(overboard.iter_moves())
+        if rng.random() < exploration:
+            move = rng.choice(moves)
+        else:
+            most = max(move.captures for move in moves)
+            move = rng.choice([move for move in moves if move.captures == most])
+
+        if length < plies:
+            opening.append(
+                (
+                    overboard.hash,
+                    move_to_action(move, overboard.board_size),
+                    overboard.turn,
+                )
+            )
+        overboard.make_move(move)
+        length += 1
+
+    return opening, winner
+
+
+# Plays games from each start, then searches every book position that
+# min_games of them went through. Searched positions are found again by
+# replaying the openings, which keeps whole boards out of the statistics.
+def build_book(
+    starts,
+    games,
+    plies=8,
+    search_depth=4,
+    min_games=4,
+    exploration=0.25,
+    seed=0,
+    progress=None,
+):
+    rng = random.Random(seed)
+    board_size = len(starts[0][0])
+    overboard = Overboard(board_size)
+
+    stats = defaultdict(lambda: [0, 0.0])
+    visits = defaultdict(int)
+    openings = []
+    for n in range(games):
+        overboard.initialize(*starts[n % len(starts)])
+        opening, winner = play_book_game(overboard, plies, exploration, rng)
+        openings.append((n % len(starts), opening))
+
+        for key, action, turn in opening:
+            entry = stats[key, action]
+            entry[0] += 1
+            entry[1] += 0 if winner == 0 else 1 if winner == turn else -1
+            visits[key] += 1
+
+        if progress is not None:
+            progress("games", n + 1, games)
+
+    search = AlphaBetaSearch(max_depth=search_depth)
+    searched = {}
+    for start, opening in openings:
+        overboard.initialize(*starts[start])
+        for key, action, turn in opening:
+            if visits[key] >= min_games and key not in searched:
+                result = search.search(overboard)
+                value = (
+                    result.value if turn == Overboard.PLAYER_WHITE else -result.value
+                )
+                searched[key] = (move_to_action(result.move, board_size), value)
+                if progress is not None:
+                    progress("searches", len(searched), None)
+            overboard.make_move(*action_to_move(action, board_size))
+
+    entries = [
+        (key, action, games, score, np.nan, 0)
+        for (key, action), (games, score) in stats.items()
+    ]
+    entries += [
+        (key, action, 0, 0.0, value, search_depth)
+        for key, (action, value) in searched.items()
+    ]
+    entries = np.array(entries, dtype=BOOK_DTYPE)
+    entries.sort(order=["key", "action"])
+    return OpeningBook(board_size, entries, min_games)
+
+
+def book_move(book: OpeningBook, fallback, overboard: Overboard):
+    move = book.probe(overboard)
+    if move is not None:
+        return move
+    return fallback(overboard)
+
+
+# Like the other agents, a partial of a module-level function so tournament
+# workers can pickle it. book is an OpeningBook or the path of a saved one.
+def book_agent(book, fallback=min_max_move, min_games=4):
+    if isinstance(book, str):
+        book = OpeningBook.load(book, min_games)
+    return functools.partial(book_move, book, fallback)
+
+
+if __name__ == "__main__":
+    positions = standard_positions()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("start", nargs="*", default=["test-board"])
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--plies", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--min-games", type=int, default=4)
+    parser.add_argument("--exploration", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    starts = [positions[name] for name in args.start]
+    output = args.output or f"book-{'-'.join(args.start)}.npz"
+
+    started = time.perf_counter()
+    book = build_book(
+        starts,
+        args.games,
+        args.plies,
+        args.depth,
+        args.min_games,
+        args.exploration,
+        args.seed,
+        progress=lambda stage, n, total: print(f"{stage}: {n}", end="\r"),
+    )
+    book.save(output)
+    print(f"Built {output} in {time.perf_counter() - started:.1f}s")
+    print(f"{len(book.entries)} entries, {len(book)} book positions")
+
+    overboard = load_position(Overboard, starts[0])
+    probes = 100_000
+    started = time.perf_counter()
+    for _ in range(probes):
+        book.probe(overboard)
+    probe_time = (time.perf_counter() - started) / probes
+
+    started = time.perf_counter()
+    AlphaBetaSearch(max_depth=args.depth).search(overboard)
+    search_time = time.perf_counter() - started
+    print(
+        f"Probe: {probe_time * 1e6:.2f}us, "
+        f"depth {args.depth} search of the start: {search_time:.2f}s"
+    )
@@ -1,5 +1,15 @@
+import functools
 import numpy as np
 import random
+from collections import namedtuple
+from actions import (
+    MAX_BOARD_SIZE as MAX_TABLE_BOARD_SIZE,
+    action_space_size,
+    gather_lines,
+    line_tables,
+    move_to_action,
+)
+from transitions import line_transitions
 
 
 class InvalidMove(Exception):
@@ -10,13 +20,136 @@ class InvalidBoard(Exception):
     pass
 
 
+Move = namedtuple("Move", ["start", "end", "direction", "captures"])
+
+ZOBRIST_SEED = 0x0B0A4D
+
+
+@functools.lru_cache
+def zobrist_keys(board_size):
+    rng = random.Random(ZOBRIST_SEED + board_size)
+    squares = board_size * board_size
+    pieces = {
+        Overboard.PLAYER_WHITE: [rng.getrandbits(64) for _ in range(squares)],
+        Overboard.PLAYER_RED: [rng.getrandbits(64) for _ in range(squares)],
+    }
+    return pieces, rng.getrandbits(64)
+
+
+# A position in as little as it takes: the white and red pieces as integer
+# bitboards with square (r, c) on bit r * board_size + c, the side to move
+# and the Zobrist hash, which is also the hash of the object. Every field is
+# an immutable int, so clone allocates one object and copies five references,
+# and a state pickles to little more than its bitboards. Engines
+# convert to and from states with get_state and set_state.
+class GameState:
+    __slots__ = ("board_size", "white", "red", "turn", "hash")
+
+    def __init__(self, board_size, white, red, turn, key=None):
+        self.board_size = board_size
+        self.white = white
+        self.red = red
+        self.turn = turn
+        self.hash = self.compute_hash() if key is None else key
+
+    @staticmethod
+    def from_board(board, turn, key=None):
+        flat = np.asarray(board).ravel()
+        return GameState(
+            len(board),
+            pack_bits(flat == Overboard.PLAYER_WHITE),
+            pack_bits(flat == Overboard.PLAYER_RED),
+            turn,
+            key,
+        )
+
+    def clone(self):
+        state = GameState.__new__(GameState)
+        state.board_size = self.board_size
+        state.white = self.white
+        state.red = self.red
+        state.turn = self.turn
+        state.hash = self.hash
+        return state
+
+    def compute_hash(self):
+        pieces, turn_key = zobrist_keys(self.board_size)
+        key = 0 if self.turn == Overboard.PLAYER_WHITE else turn_key
+        for player, bitboard in [
+            (Overboard.PLAYER_WHITE, self.white),
+            (Overboard.PLAYER_RED, self.red),
+        ]:
+            keys = pieces[player]
+            while bitboard:
+                bit = bitboard & -bitboard
+                key ^= keys[bit.bit_length() - 1]
+                bitboard ^= bit
+        return key
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, GameState)
+            and self.hash == other.hash
+            and self.white == other.white
+            and self.red == other.red
+            and self.turn == other.turn
+            and self.board_size == other.board_size
+        )
+
+    def __repr__(self):
+        return (
+            f"GameState(board_size={self.board_size}, white={self.white:#x}, "
+            f"red={self.red:#x}, turn={self.turn})"
+        )
+
+    # The (row, col) squares of the pieces of a bitboard.
+    def squares(self, bitboard):
+        squares = []
+        while bitboard:
+            bit = bitboard & -bitboard
+            squares.append(divmod(bit.bit_length() - 1, self.board_size))
+            bitboard ^= bit
+        return squares
+
+    # The pieces of every row, square c of a row on bit c.
+    def rows(self, bitboard):
+        mask = (1 << self.board_size) - 1
+        return [
+            (bitboard >> (r * self.board_size)) & mask for r in range(self.board_size)
+        ]
+
+    def to_board(self):
+        squares = self.board_size**2
+        return (
+            unpack_bits(self.white, squares) * Overboard.PLAYER_WHITE
+            + unpack_bits(self.red, squares) * Overboard.PLAYER_RED
+        ).reshape(self.board_size, self.board_size)
+
+
+def pack_bits(mask):
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def unpack_bits(bitboard, count):
+    data = np.frombuffer(bitboard.to_bytes((count + 7) // 8, "little"), np.uint8)
+    return np.unpackbits(data, count=count, bitorder="little").astype(int)
+
+
 class Overboard:
     EMPTY = 0
     PLAYER_WHITE = 1
     PLAYER_RED = 2
 
-    def __init__(self, board_size=8):
+    # Whether slides are looked up in transitions.line_transitions.
+    USE_TABLES = True
+
+    def __init__(self, board_size=8, debug=False):
         self.board_size = board_size
+        self.debug = debug
+        self.action_mask = None
         self.reset()
 
     @staticmethod
@@ -29,13 +162,11 @@ class Overboard:
 
     def reset(self):
         self.initialized = False
-        self.board = np.array(
-            [
-                [self.EMPTY for _ in range(self.board_size)]
-                for _ in range(self.board_size)
-            ]
-        )
+        self.board = np.zeros((self.board_size, self.board_size), dtype=int)
         self.turn = self.PLAYER_WHITE
+        self.history = []
+        self.compute_hash()
+        self.compute_counters()
 
     def initialize_randomly(self):
         self.reset()
@@ -46,9 +177,10 @@ class Overboard:
         pieces = [self.PLAYER_WHITE] * piece_count + [self.PLAYER_RED] * piece_count
         random.shuffle(pieces)
 
-        for r in range(self.board_size):
-            for c in range(self.board_size):
-                self.board[r, c] = pieces[r * self.board_size + c]
+        self.board[:] = np.array(pieces).reshape(self.board_size, self.board_size)
+
+        self.compute_hash()
+        self.compute_counters()
 
     def initialize_test_board(self):
         board = np.array(
@@ -72,23 +204,81 @@ class Overboard:
         self.reset()
         self.initialized = True
 
-        self.board = board
+        self.board = board.copy()
         self.board_size = self.board.shape[0]
         self.turn = turn
+        self.compute_hash()
+        self.compute_counters()
+
+    def compute_hash(self):
+        self.zobrist_pieces, self.zobrist_turn = zobrist_keys(self.board_size)
+
+        self.hash = 0 if self.turn == self.PLAYER_WHITE else self.zobrist_turn
+        for square, piece in enumerate(self.board.flat):
+            if piece != self.EMPTY:
+                self.hash ^= self.zobrist_pieces[piece][square]
+
+    def compute_counters(self):
+        self.piece_positions = {
+            player: set(zip(*map(np.ndarray.tolist, np.where(self.board == player))))
+            for player in [self.PLAYER_WHITE, self.PLAYER_RED]
+        }
+        self.piece_counts = {
+            player: len(positions) for player, positions in self.piece_positions.items()
+        }
+
+    def check_counters(self):
+        expected = Overboard.from_numpy(self.board, self.turn)
+        assert self.hash == expected.hash
+        assert self.piece_counts == expected.piece_counts
+        assert self.piece_positions == expected.piece_positions
+
+    def get_piece_count(self, player):
+        return self.piece_counts[player]
+
+    def get_state(self):
+        return GameState.from_board(self.board, self.turn, self.hash)
+
+    # Only the squares of the pieces are written, and the hash comes with
+    # the state, so restoring costs a board allocation plus the pieces.
+    def set_state(self, state: GameState):
+        self.board_size = state.board_size
+        self.board = np.zeros((self.board_size, self.board_size), dtype=int)
+        self.piece_positions = {}
+        for player, bitboard in [
+            (self.PLAYER_WHITE, state.white),
+            (self.PLAYER_RED, state.red),
+        ]:
+            squares = state.squares(bitboard)
+            self.piece_positions[player] = set(squares)
+            if squares:
+                self.board[tuple(zip(*squares))] = player
+        self.piece_counts = {
+            player: len(positions) for player, positions in self.piece_positions.items()
+        }
+
+        self.zobrist_pieces, self.zobrist_turn = zobrist_keys(self.board_size)
+        self.hash = state.hash
+        self.turn = state.turn
+        self.history = []
+        self.initialized = True
 
     def get_winner(self):
-        if not np.any(self.board == self.PLAYER_RED):
+        if not self.get_piece_count(self.PLAYER_RED):
             return self.PLAYER_WHITE
 
-        if not np.any(self.board == self.PLAYER_WHITE):
+        if not self.get_piece_count(self.PLAYER_WHITE):
             return self.PLAYER_RED
 
         return None
 
+    def is_own_piece(self, position):
+        return position in self.piece_positions[self.turn]
+
     def get_player_piece_positions(self):
         assert self.initialized == True
 
-        return list(zip(*np.where(self.board == self.turn)))
+        return sorted(self.piece_positions[self.turn])
 
     def get_moves(self):
         moves = []
@@ -101,6 +291,153 @@ class Overboard:
 
         return moves
 
+    # The reach (see get_line_reach) of every piece of the side to move in
+    # every direction, in the order moves are generated.
+    def iter_reaches(self):
+        for r, c in self.get_player_piece_positions():
+            r, c = int(r), int(c)
+            row = self.get_line((r, c), (0, 1))
+            col = self.get_line((r, c), (1, 0))
+            for line, index, direction in (
+                (row, c, (0, -1)),
+                (row, c, (0, +1)),
+                (col, r, (-1, 0)),
+                (col, r, (+1, 0)),
+            ):
+                first_capture, last_step = self.get_line_reach(
+                    line, index, sum(direction)
+                )
+                yield (r, c), direction, first_capture, last_step
+
+    def iter_moves(self):
+        for (r, c), direction, first_capture, last_step in self.iter_reaches():
+            steps = ([1] if first_capture > 1 else []) + list(
+                range(first_capture, last_step + 1)
+            )
+            for step in steps:
+                yield Move(
+                    (r, c),
+                    (r + step * direction[0], c + step * direction[1]),
+                    direction,
+                    max(0, step - first_capture + 1),
+                )
+
+    # iter_moves in two stages, for searches that try captures first and
+    # can often stop before the quiet moves are needed. Together they yield
+    # the same moves as iter_moves, each stage in iter_moves order.
+    def iter_captures(self):
+        for (r, c), direction, first_capture, last_step in self.iter_reaches():
+            for step in range(first_capture, last_step + 1):
+                yield Move(
+                    (r, c),
+                    (r + step * direction[0], c + step * direction[1]),
+                    direction,
+                    step - first_capture + 1,
+                )
+
+    # A step pushes nothing off as long as there is an empty square ahead
+    # to close, which is when the first capture is further than one step.
+    def iter_quiet_moves(self):
+        for (r, c), direction, first_capture, _ in self.iter_reaches():
+            if first_capture > 1:
+                yield Move((r, c), (r + direction[0], c + direction[1]), direction, 0)
+
+    # Whether a quiet move, for instance one remembered from another
+    # position, can be played here.
+    def is_legal_quiet_move(self, move):
+        (r, c), (dr, dc) = move.start, move.direction
+        if (
+            move.captures
+            or abs(dr) + abs(dc) != 1
+            or move.end != (r + dr, c + dc)
+            or not self.is_own_piece(move.start)
+        ):
+            return False
+
+        axis, index = ((1, 0), r) if dr else ((0, 1), c)
+        first_capture, _ = self.get_line_reach(
+            self.get_line(move.start, axis), index, dr + dc
+        )
+        return first_capture > 1
+
+    # Fills and returns a boolean array over the actions of the actions
+    # module. The array is reused between calls, so copy it to keep it.
+    def legal_action_mask(self):
+        size = self.board_size
+        if self.action_mask is None or len(self.action_mask) != action_space_size(size):
+            self.action_mask = np.zeros(action_space_size(size), dtype=bool)
+
+        if size > MAX_TABLE_BOARD_SIZE:
+            self.action_mask[:] = False
+            for move in self.iter_moves():
+                self.action_mask[move_to_action(move, size)] = True
+            return self.action_mask
+
+        board = self.board[None]
+        gather_lines(
+            board == self.turn,
+            board != self.EMPTY,
+            line_tables(size).legal,
+            out=[self.action_mask.reshape(1, size, size, 4, size - 1)],
+        )
+        return self.action_mask
+
+    def get_line(self, position, axis):
+        if axis == (0, 1):
+            return self.board[position[0], :].tolist()
+        return self.board[:, position[1]].tolist()
+
+    # Once every gap ahead of the slider is closed, each further step pushes
+    # the farthest piece of the line off the board. Returns the first step
+    # that pushes a piece off and the last step before one of our own pieces
+    # would go over.
+    def get_line_reach(self, line, index, direction):
+        ahead = line[index + 1 :] if direction > 0 else line[:index][::-1]
+        pieces = [piece for piece in ahead if piece != self.EMPTY]
+        first_capture = len(ahead) - len(pieces) + 1
+
+        captures = 0
+        for piece in reversed(pieces):
+            if piece == self.turn:
+                break
+            captures += 1
+
+        return first_capture, first_capture + captures - 1
+
+    def get_move(self, start_position, end_position):
+        start_position = tuple(map(int, start_position))
+        end_position = tuple(map(int, end_position))
+        assert self.is_own_piece(start_position)
+
+        if start_position[0] == end_position[0]:
+            index, end_index = start_position[1], end_position[1]
+            axis = (0, 1)
+        elif start_position[1] == end_position[1]:
+            index, end_index = start_position[0], end_position[0]
+            axis = (1, 0)
+        else:
+            raise InvalidMove("You can only slide in one direction")
+
+        steps = abs(end_index - index)
+        if steps == 0:
+            return Move(start_position, end_position, (0, 0), 0)
+
+        direction = 1 if end_index > index else -1
+        first_capture, last_step = self.get_line_reach(
+            self.get_line(start_position, axis), index, direction
+        )
+        if steps > last_step:
+            raise InvalidMove("Can not overboard your own piece")
+        if steps != 1 and steps < first_capture:
+            raise InvalidMove("Invalid move")
+
+        return Move(
+            start_position,
+            end_position,
+            (axis[0] * direction, axis[1] * direction),
+            max(0, steps - first_capture + 1),
+        )
+
     def get_slides_for_piece(self, piece_position, valid_only=True):
         assert self.board[*piece_position] == self.turn
 
@@ -109,39 +446,125 @@ class Overboard:
 
         left_moves = [
             ((piece_position[0], i), preview, valid)
-            for i, preview, valid in self.get_shifts(pieces_row, piece_position[1], -1)
+            for i, preview, valid in self.get_line_slides(
+                pieces_row, piece_position[1], -1
+            )
             if not valid_only or valid
         ]
 
         right_moves = [
             ((piece_position[0], i), preview, valid)
-            for i, preview, valid in self.get_shifts(pieces_row, piece_position[1], +1)
+            for i, preview, valid in self.get_line_slides(
+                pieces_row, piece_position[1], +1
+            )
             if not valid_only or valid
         ]
 
         up_moves = [
             ((i, piece_position[1]), preview, valid)
-            for i, preview, valid in self.get_shifts(pieces_col, piece_position[0], -1)
+            for i, preview, valid in self.get_line_slides(
+                pieces_col, piece_position[0], -1
+            )
             if not valid_only or valid
         ]
 
         down_moves = [
             ((i, piece_position[1]), preview, valid)
-            for i, preview, valid in self.get_shifts(pieces_col, piece_position[0], +1)
+            for i, preview, valid in self.get_line_slides(
+                pieces_col, piece_position[0], +1
+            )
             if not valid_only or valid
         ]
 
         return left_moves + right_moves + up_moves + down_moves
 
-    def make_move(self, start_position, end_position):
-        board, valid = self.get_preview_board(start_position, end_position)
-        if valid:
-            self.board = board
-            self.turn = (
-                self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
-            )
-        else:
-            raise Exception("Invalid move")
+    def make_move(self, start_position, end_position=None):
+        move = (
+            start_position
+            if end_position is None
+            else self.get_move(start_position, end_position)
+        )
+
+        line, index, direction = self.get_move_line(move)
+        saved = line.tolist()
+        pieces = saved.copy()
+        steps = abs(move.end[0] - move.start[0]) + abs(move.end[1] - move.start[1])
+        for _ in range(steps):
+            self.push_line(pieces, index, direction)
+            index += direction
+        line[:] = pieces
+
+        self.history.append((move, saved, self.hash))
+        for square, before, after in zip(self.get_line_squares(move), saved, pieces):
+            if before != after:
+                if before != self.EMPTY:
+                    self.hash ^= self.zobrist_pieces[before][square]
+                if after != self.EMPTY:
+                    self.hash ^= self.zobrist_pieces[after][square]
+        self.hash ^= self.zobrist_turn
+        self.move_pieces(move, saved, pieces)
+
+        self.turn = (
+            self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
+        )
+        self.piece_counts[self.turn] -= move.captures
+
+        if self.debug:
+            self.check_counters()
+        return move
+
+    def unmake_move(self):
+        move, saved, self.hash = self.history.pop()
+
+        line, _, _ = self.get_move_line(move)
+        self.move_pieces(move, line.tolist(), saved)
+        line[:] = saved
+
+        self.piece_counts[self.turn] += move.captures
+        self.turn = (
+            self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
+        )
+
+        if self.debug:
+            self.check_counters()
+        return move
+
+    def move_pieces(self, move, before_line, after_line):
+        for square, before, after in zip(
+            self.get_line_squares(move), before_line, after_line
+        ):
+            if before != after:
+                position = divmod(square, self.board_size)
+                if before != self.EMPTY:
+                    self.piece_positions[before].remove(position)
+                if after != self.EMPTY:
+                    self.piece_positions[after].add(position)
+
+    def get_move_line(self, move):
+        (r, c), (dr, dc) = move.start, move.direction
+        if dr:
+            return self.board[:, c], r, dr
+        return self.board[r, :], c, dc
+
+    def get_line_squares(self, move):
+        (r, c), (dr, _) = move.start, move.direction
+        if dr:
+            return range(c, self.board_size**2, self.board_size)
+        return range(r * self.board_size, (r + 1) * self.board_size)
+
+    def push_line(self, pieces, index, direction):
+        end = index
+        while (
+            0 <= end + direction < self.board_size
+            and pieces[end + direction] != self.EMPTY
+        ):
+            end += direction
+
+        i = end + direction if 0 <= end + direction < self.board_size else end
+        while i != index:
+            pieces[i] = pieces[i - direction]
+            i -= direction
+        pieces[index] = self.EMPTY
 
     def get_preview_board(self, start_position, end_position):
         assert self.board[*start_position] == self.turn
@@ -152,26 +575,58 @@ class Overboard:
         if start_position[0] == end_position[0]:
             pieces_row = self.board[start_position[0], :].copy()
             direction = 1 if end_position[1] > start_position[1] else -1
-            shifts = self.get_shifts(
+            slide = self.get_line_slide(
                 pieces_row, start_position[1], direction, end_position[1]
             )
-            if len(shifts):
-                _, preview, valid = shifts[-1]
+            if slide is not None:
+                preview, valid = slide
                 preview_board[start_position[0], :] = preview
         elif start_position[1] == end_position[1]:
             pieces_col = self.board[:, start_position[1]].copy()
             direction = 1 if end_position[0] > start_position[0] else -1
-            shifts = self.get_shifts(
+            slide = self.get_line_slide(
                 pieces_col, start_position[0], direction, end_position[0]
             )
-            if len(shifts):
-                _, preview, valid = shifts[-1]
+            if slide is not None:
+                preview, valid = slide
                 preview_board[:, start_position[1]] = preview
         else:
             raise Exception("You can only slide in one direction")
 
         return preview_board, valid
 
+    # The line transition tables for this board, or None to simulate every
+    # slide with get_shifts.
+    def line_transitions(self):
+        return line_transitions(self.board_size) if self.USE_TABLES else None
+
+    # Slides of a line, looked up in the line transition tables when the
+    # board is small enough to have them, otherwise simulated by get_shifts.
+    def get_line_slides(self, pieces, start_index, direction):
+        tables = self.line_transitions()
+        if tables is None:
+            return self.get_shifts(pieces, start_index, direction)
+        return tables.slides(pieces, start_index, direction)
+
+    # The last of the slides up to end_index, as (line, valid), or None when
+    # the piece does not move.
+    def get_line_slide(self, pieces, start_index, direction, end_index):
+        steps = abs(end_index - start_index)
+        if steps == 0:
+            return None
+
+        tables = self.line_transitions()
+        if tables is None:
+            _, preview, valid = self.get_shifts(
+                pieces, start_index, direction, end_index
+            )[-1]
+            return preview, valid
+
+        slide = tables.slide(pieces, start_index, direction, steps)
+        if slide is None:
+            raise Exception("Can not overboard your own piece")
+        return slide
+
     def get_shifts(self, pieces, start_index, direction, end_index=None):
         pieces = pieces.copy()
 
@@ -212,3 +667,18 @@ class Overboard:
 
         for r in range(self.board_size):
             print(" ".join(list(map(str, self.board[r]))))
+
+
+# Overboard with every slide simulated by get_shifts, the original rules,
+# and never looked up in the transition tables. perft and
+# bitboard.compare_with_reference check faster engines against it.
+class ReferenceOverboard(Overboard):
+    USE_TABLES = False
+
+    @staticmethod
+    def from_numpy(board, turn=Overboard.PLAYER_WHITE):
+        assert board.shape[0] == board.shape[1]
+
+        overboard = ReferenceOverboard(board_size=board.shape[0])
+        overboard.initialize(board, turn)
+        return overboard
@@ -0,0 +1,218 @@
+import argparse
+import functools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from overboard import Overboard
+from search import AlphaBetaSearch, SearchResult
+from transposition import TranspositionTable
+
+# One table per worker process, allocated once and cleared for every task.
+# A table kept between tasks would make the result of a root move depend on
+# which moves the same worker searched before it, and so on the number of
+# workers.
+worker_tables = {}
+
+
+def worker_table(size):
+    if size not in worker_tables:
+        worker_tables[size] = TranspositionTable(size)
+    else:
+        worker_tables[size].clear()
+    return worker_tables[size]
+
+
+# Searches the position after one root move, within an optional window (see
+# AlphaBetaSearch.search). Returns the value from white's point of view and
+# the number of nodes searched.
+def search_root_move(task):
+    engine, state, move, depth, window, table_size = task
+
+    overboard = engine(board_size=state.board_size)
+    overboard.set_state(state)
+    overboard.make_move(move)
+
+    search = AlphaBetaSearch(
+        max_depth=depth - 1,
+        transposition_table=None if table_size is None else worker_table(table_size),
+    )
+    winner = overboard.get_winner()
+    if winner is not None:
+        win = search.WIN_SCORE
+        return (win if winner == Overboard.PLAYER_WHITE else -win), 1
+    if depth == 1:
+        value = search.evaluate(overboard)
+        return (value if overboard.turn == Overboard.PLAYER_WHITE else -value), 1
+
+    result = search.search(overboard, window)
+    return result.value, result.stats["nodes"]
+
+
+class RootParallelSearch:
+    def __init__(self, max_depth=3, workers=None, table_size=None):
+        self.max_depth = max_depth
+        self.workers = workers or os.cpu_count()
+        self.table_size = table_size
+        self.pool = None
+
+    # The pool is started on the first search and kept for later ones, so
+    # the workers are not respawned every move. It is not pickled with the
+    # search, which lets agents built on it be sent to other processes.
+    def __getstate__(self):
+        return {**self.__dict__, "pool": None}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def map(self, tasks):
+        if self.workers == 1:
+            return list(map(search_root_move, tasks))
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return list(self.pool.map(search_root_move, tasks))
+
+    # Root moves are independent, so they are searched on separate workers.
+    # Splitting them naively gives up the alpha-beta bound that serial search
+    # carries from one root move to the next, so the most capturing move is
+    # searched first and every other move only has to be compared against
+    # its value with a narrow window. The few that turn out better are then
+    # searched exactly. The first best move in iter_moves order is returned,
+    # like min_max_move, and every task starts from an empty table (see
+    # worker_table), so the result is the same for any number of workers.
+    def search(self, overboard: Overboard):
+        started = time.perf_counter()
+
+        moves = list(overboard.iter_moves())
+        if not moves:
+            return SearchResult(None, None, 0, [], {"nodes": 1, "time": 0.0})
+
+        # Tasks carry the position as a GameState, which pickles to a
+        # fraction of the size of a numpy board.
+        state = overboard.get_state()
+
+        def tasks(indices, window=None):
+            return [
+                (
+                    type(overboard),
+                    state,
+                    moves[i],
+                    self.max_depth,
+                    window,
+                    self.table_size,
+                )
+                for i in indices
+            ]
+
+        # Values are compared from the point of view of the side to move.
+        sign = 1 if overboard.turn == Overboard.PLAYER_WHITE else -1
+        first = max(range(len(moves)), key=lambda i: moves[i].captures)
+        ((first_value, nodes),) = self.map(tasks([first]))
+        values = {first: sign * first_value}
+
+        others = [i for i in range(len(moves)) if i != first]
+        window = (first_value - 1, first_value + 1)
+        better = []
+        for i, (value, searched) in zip(others, self.map(tasks(others, window))):
+            nodes += searched
+            if sign * value == sign * first_value:
+                values[i] = sign * value
+            elif sign * value > sign * first_value:
+                better.append(i)
+
+        for i, (value, searched) in zip(better, self.map(tasks(better))):
+            nodes += searched
+            values[i] = sign * value
+
+        best_value = max(values.values())
+        best = min(i for i, value in values.items() if value == best_value)
+
+        stats = {
+            "nodes": 1 + nodes,
+            "root_moves": len(moves),
+            "researched": len(better),
+            "workers": self.workers,
+            "depth": self.max_depth,
+            "time": time.perf_counter() - started,
+        }
+        return SearchResult(
+            moves[best],
+            sign * best_value,
+            self.max_depth,
+            [moves[best]],
+            stats,
+        )
+
+
+def parallel_move(search: RootParallelSearch, overboard: Overboard):
+    move = search.search(overboard).move
+    return (move.start, move.end)
+
+
+def parallel_agent(max_depth=3, workers=None, table_size=None):
+    return functools.partial(
+        parallel_move, RootParallelSearch(max_depth, workers, table_size)
+    )
+
+
+# Searches seeded positions with every number of workers and checks that
+# they all agree with a single worker, with and without transposition
+# tables.
+def compare_worker_counts(
+    worker_counts=(2, 3), board_size=6, depth=3, positions=3, table_size=1 << 14
+):
+    for seed in range(positions):
+        random.seed(seed)
+        overboard = Overboard(board_size)
+        overboard.initialize_randomly()
+
+        for size in [None, table_size]:
+            expected = RootParallelSearch(depth, 1, size).search(overboard)
+            for workers in worker_counts:
+                search = RootParallelSearch(depth, workers, size)
+                actual = search.search(overboard)
+                search.close()
+                assert (actual.move, actual.value) == (
+                    expected.move,
+                    expected.value,
+                ), (seed, size, workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--table-size", type=int, default=None)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="check that every worker count finds the same move",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        compare_worker_counts()
+        print("All worker counts find the same moves")
+
+    random.seed(args.seed)
+    overboard = Overboard(args.board_size)
+    overboard.initialize_randomly()
+
+    serial = RootParallelSearch(args.depth, 1, args.table_size).search(overboard)
+    search = RootParallelSearch(args.depth, args.workers, args.table_size)
+    search.search(overboard)  # starts the pool
+    parallel = search.search(overboard)
+    search.close()
+
+    assert serial.move == parallel.move
+    print(f"Best move {serial.move} with value {serial.value}")
+    print(f"1 worker: {serial.stats['time']:.2f}s, {serial.stats['nodes']} nodes")
+    print(
+        f"{args.workers} workers: {parallel.stats['time']:.2f}s "
+        f"({serial.stats['time'] / parallel.stats['time']:.1f}x)"
+    )
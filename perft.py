@@ -0,0 +1,212 @@
+import argparse
+import random
+import time
+from actions import move_to_action
+from bitboard import BitboardOverboard
+from overboard import Overboard, ReferenceOverboard
+from sparse import SparseOverboard
+
+ENGINES = {
+    "tables": Overboard,
+    "reference": ReferenceOverboard,
+    "bitboard": BitboardOverboard,
+    "sparse": SparseOverboard,
+}
+
+# Leaf counts of the standard positions below, by depth, as generated by
+# ReferenceOverboard.get_moves (the original get_shifts rules). Any move generator
+# has to reproduce these exactly.
+REFERENCE_COUNTS = {
+    "random-4-0": [26, 552, 12266, 229776],
+    "random-4-1": [22, 464, 9391, 178300],
+    "random-4-2": [17, 327, 5949, 113802],
+    "random-6-0": [58, 3536, 206309],
+    "random-6-1": [61, 3237, 200591],
+    "random-6-2": [44, 2591, 127705],
+    "random-8-0": [98, 10328, 1091851],
+    "random-8-1": [85, 11024, 1029516],
+    "random-8-2": [77, 8869, 776331],
+    "test-board": [39, 2267, 69029],
+}
+
+
+def standard_position(board_size, seed):
+    random.seed(seed)
+    overboard = Overboard(board_size)
+    overboard.initialize_randomly()
+    return overboard.board.copy(), overboard.turn
+
+
+def test_position():
+    overboard = Overboard()
+    overboard.initialize_test_board()
+    return overboard.board.copy(), overboard.turn
+
+
+def standard_positions():
+    positions = {
+        f"random-{size}-{seed}": standard_position(size, seed)
+        for size in [4, 6, 8]
+        for seed in range(3)
+    }
+    positions["test-board"] = test_position()
+    return positions
+
+
+def load_position(engine, position):
+    board, turn = position
+    overboard = engine(board_size=len(board))
+    overboard.initialize(board, turn)
+    return overboard
+
+
+# Counts the positions reached after exactly depth moves. A finished game
+# leaves the side to move without pieces, and so without moves, so wins need
+# no special casing. Counts are cached by (hash, depth) when a dict is given.
+def perft(overboard, depth, cache=None):
+    if depth == 0:
+        return 1
+
+    if cache is not None:
+        key = (overboard.hash, depth)
+        if key in cache:
+            return cache[key]
+
+    if depth == 1:
+        nodes = sum(1 for _ in overboard.iter_moves())
+    else:
+        nodes = 0
+        for move in overboard.iter_moves():
+            overboard.make_move(move)
+            nodes += perft(overboard, depth - 1, cache)
+            overboard.unmake_move()
+
+    if cache is not None:
+        cache[key] = nodes
+    return nodes
+
+
+# The same count driven by get_moves of a ReferenceOverboard, which is
+# built on get_shifts, to check faster generators against the original
+# rules.
+def reference_perft(overboard, depth):
+    if depth == 0:
+        return 1
+
+    moves = overboard.get_moves()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for piece, move, _ in moves:
+        overboard.make_move(piece, move)
+        nodes += reference_perft(overboard, depth - 1)
+        overboard.unmake_move()
+    return nodes
+
+
+def divide(overboard, depth, cache=None):
+    counts = {}
+    for move in overboard.iter_moves():
+        overboard.make_move(move)
+        counts[(move.start, move.end)] = perft(overboard, depth - 1, cache)
+        overboard.unmake_move()
+    return counts
+
+
+def reference_divide(overboard, depth):
+    counts = {}
+    for piece, move, _ in overboard.get_moves():
+        piece, move = tuple(map(int, piece)), tuple(map(int, move))
+        overboard.make_move(piece, move)
+        counts[(piece, move)] = reference_perft(overboard, depth - 1)
+        overboard.unmake_move()
+    return counts
+
+
+# Returns the root moves whose subtree counts differ from the reference,
+# with (expected, actual) counts; None stands for a move only one side has.
+def verify(engine, position, depth):
+    expected = reference_divide(load_position(ReferenceOverboard, position), depth)
+    actual = divide(load_position(engine, position), depth)
+    return {
+        move: (expected.get(move), actual.get(move))
+        for move in expected.keys() | actual.keys()
+        if expected.get(move) != actual.get(move)
+    }
+
+
+def check_reference_counts(engine=Overboard, cache=True):
+    positions = standard_positions()
+    for name, counts in REFERENCE_COUNTS.items():
+        overboard = load_position(engine, positions[name])
+        for depth, expected in enumerate(counts, start=1):
+            actual = perft(overboard, depth, {} if cache else None)
+            assert actual == expected, (name, depth, expected, actual)
+
+
+# legal_action_mask against iter_moves along random games, on boards with
+# line tables and on 10x10, where the mask is filled from iter_moves. Sizes
+# the engine does not support are skipped.
+def check_action_masks(engine=Overboard, board_sizes=(4, 8, 10), games=10, seed=0):
+    random.seed(seed)
+    for board_size in board_sizes:
+        if board_size > getattr(engine, "MAX_BOARD_SIZE", board_size):
+            continue
+        for _ in range(games):
+            overboard = engine(board_size)
+            overboard.initialize_randomly()
+            while overboard.get_winner() is None:
+                moves = list(overboard.iter_moves())
+                expected = sorted(move_to_action(move, board_size) for move in moves)
+                actual = overboard.legal_action_mask().nonzero()[0].tolist()
+                assert actual == expected, (board_size, overboard.board.tolist())
+                if len(overboard.history) == 20:
+                    break
+                overboard.make_move(random.choice(moves))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("position", nargs="?", default="test-board")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--engine", choices=ENGINES, default="bitboard")
+    parser.add_argument("--divide", action="store_true")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="compare against ReferenceOverboard.get_moves",
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="check the reference counts"
+    )
+    args = parser.parse_args()
+
+    engine = ENGINES[args.engine]
+
+    if args.check:
+        check_reference_counts(engine, args.cache)
+        check_action_masks(engine)
+        print(f"{args.engine}: all reference counts and action masks match")
+    elif args.verify:
+        mismatches = verify(engine, standard_positions()[args.position], args.depth)
+        for move, (expected, actual) in sorted(mismatches.items()):
+            print(f"{move}: expected {expected}, got {actual}")
+        print(f"{len(mismatches)} mismatching root moves")
+    else:
+        overboard = load_position(engine, standard_positions()[args.position])
+        cache = {} if args.cache else None
+
+        started = time.perf_counter()
+        if args.divide:
+            counts = divide(overboard, args.depth, cache)
+            for (piece, move), count in counts.items():
+                print(f"{piece} -> {move}: {count}")
+            nodes = sum(counts.values())
+        else:
+            nodes = perft(overboard, args.depth, cache)
+        seconds = time.perf_counter() - started
+
+        print(f"Nodes: {nodes}")
+        print(f"Time: {seconds:.3f}s ({nodes / seconds:,.0f} nodes/s)")
@@ -0,0 +1,333 @@
+import argparse
+import json
+import os
+import time
+import numpy as np
+from batched import BatchedOverboard
+from overboard import Overboard
+
+FORMAT_VERSION = 1
+
+# A dataset is a directory of chunks plus an index.json. Every chunk is three
+# .npy files that can be memory-mapped:
+#   games:  one row per game with the initial board, side to move, winner
+#           (0 for a draw), number of moves and offset of its first move
+#   moves:  one row per move with its action (see actions.encode_action, -1
+#           when the side to move was stuck and lost) and an optional search
+#           value, NaN when absent
+#   visits: optional sparse visit counts, one row per (move, action) pair,
+#           with move indexing the moves of the same chunk
+MOVE_DTYPE = np.dtype([("action", np.int32), ("value", np.float32)])
+VISIT_DTYPE = np.dtype([("move", np.int64), ("action", np.int32), ("count", np.int32)])
+
+
+def game_dtype(board_size):
+    return np.dtype(
+        [
+            ("board", np.int8, (board_size * board_size,)),
+            ("turn", np.int8),
+            ("winner", np.int8),
+            ("length", np.int32),
+            ("offset", np.int64),
+        ]
+    )
+
+
+def read_index(directory):
+    with open(os.path.join(directory, "index.json")) as f:
+        index = json.load(f)
+    if index.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"{directory} holds a version {index.get('version')} dataset, but "
+            f"version {FORMAT_VERSION} is needed"
+        )
+    return index
+
+
+def chunk_paths(directory, name):
+    return {
+        part: os.path.join(directory, f"{name}-{part}.npy")
+        for part in ["games", "moves", "visits"]
+    }
+
+
+# Buffers games and writes them out chunk_size games at a time, so memory
+# stays bounded however many games are written. Writing to an existing
+# dataset appends new chunks to it.
+class GameWriter:
+    def __init__(self, directory, board_size, chunk_size=100_000):
+        self.directory = directory
+        self.board_size = board_size
+        self.chunk_size = chunk_size
+
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(os.path.join(directory, "index.json")):
+            self.index = read_index(directory)
+            assert self.index["board_size"] == board_size
+        else:
+            self.index = {
+                "version": FORMAT_VERSION,
+                "board_size": board_size,
+                "chunks": [],
+            }
+
+        self.reset_buffers()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset_buffers(self):
+        self.games = []
+        self.moves = []
+        self.visits = []
+        self.buffered_games = 0
+        self.buffered_moves = 0
+
+    # Adds games from arrays: boards shaped (games, size, size), actions
+    # shaped (games, max_length) and padded past each game's length.
+    def add_games(self, boards, actions, lengths, winners, turns=None, values=None):
+        count = len(boards)
+        lengths = np.asarray(lengths, dtype=np.int32)
+
+        games = np.zeros(count, dtype=game_dtype(self.board_size))
+        games["board"] = np.asarray(boards).reshape(count, -1)
+        games["turn"] = Overboard.PLAYER_WHITE if turns is None else turns
+        games["winner"] = winners
+        games["length"] = lengths
+        games["offset"] = self.buffered_moves + np.cumsum(lengths) - lengths
+
+        played = np.arange(np.asarray(actions).shape[1]) < lengths[:, None]
+        moves = np.zeros(int(lengths.sum()), dtype=MOVE_DTYPE)
+        moves["action"] = np.asarray(actions)[played]
+        moves["value"] = np.nan if values is None else np.asarray(values)[played]
+
+        self.games.append(games)
+        self.moves.append(moves)
+        self.buffered_games += count
+        self.buffered_moves += len(moves)
+
+        if self.buffered_games >= self.chunk_size:
+            self.flush()
+
+    # visits holds, for each move, a pair of (actions, counts) arrays or None.
+    def add_game(self, board, actions, winner, turn=None, values=None, visits=None):
+        first_move = self.buffered_moves
+        if visits is not None:
+            for i, move_visits in enumerate(visits):
+                if move_visits is None:
+                    continue
+                visit_actions, counts = move_visits
+                rows = np.zeros(len(visit_actions), dtype=VISIT_DTYPE)
+                rows["move"] = first_move + i
+                rows["action"] = visit_actions
+                rows["count"] = counts
+                self.visits.append(rows)
+
+        self.add_games(
+            np.asarray(board)[None],
+            np.asarray(actions, dtype=np.int32)[None],
+            [len(actions)],
+            [winner],
+            None if turn is None else [turn],
+            None if values is None else np.asarray(values, dtype=np.float32)[None],
+        )
+
+    def flush(self):
+        if not self.buffered_games:
+            return
+
+        name = f"{len(self.index['chunks']):06d}"
+        paths = chunk_paths(self.directory, name)
+        np.save(paths["games"], np.concatenate(self.games))
+        np.save(paths["moves"], np.concatenate(self.moves))
+        np.save(
+            paths["visits"], np.concatenate(self.visits or [np.zeros(0, VISIT_DTYPE)])
+        )
+
+        self.index["chunks"].append(
+            {"name": name, "games": self.buffered_games, "moves": self.buffered_moves}
+        )
+        with open(os.path.join(self.directory, "index.json"), "w") as f:
+            json.dump(self.index, f, indent=2)
+
+        self.reset_buffers()
+
+    def close(self):
+        self.flush()
+
+
+class GameChunk:
+    def __init__(self, directory, name):
+        paths = chunk_paths(directory, name)
+        self.games = np.load(paths["games"], mmap_mode="r")
+        self.moves = np.load(paths["moves"], mmap_mode="r")
+        self.visits = np.load(paths["visits"], mmap_mode="r")
+
+    def __len__(self):
+        return len(self.games)
+
+    # Game number of every move, for per-move arrays that need per-game data.
+    def move_games(self):
+        return np.repeat(np.arange(len(self.games)), self.games["length"])
+
+
+# Reads a dataset as NumPy arrays. Chunks are memory-mapped, so opening even a
+# large dataset reads nothing until arrays are used.
+class GameReader:
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = read_index(directory)
+        self.board_size = self.index["board_size"]
+        self.chunks = [
+            GameChunk(directory, chunk["name"]) for chunk in self.index["chunks"]
+        ]
+        self.chunk_starts = np.cumsum([0] + [len(chunk) for chunk in self.chunks])
+        self.chunk_move_starts = np.cumsum(
+            [0] + [len(chunk.moves) for chunk in self.chunks]
+        )
+
+    def __len__(self):
+        return int(self.chunk_starts[-1])
+
+    def move_count(self):
+        return int(self.chunk_move_starts[-1])
+
+    def concatenate(self, part, field=None):
+        arrays = [getattr(chunk, part) for chunk in self.chunks]
+        if field is not None:
+            arrays = [array[field] for array in arrays]
+        return np.concatenate(arrays) if arrays else np.zeros(0)
+
+    def boards(self):
+        return self.concatenate("games", "board").reshape(
+            -1, self.board_size, self.board_size
+        )
+
+    def winners(self):
+        return self.concatenate("games", "winner")
+
+    def lengths(self):
+        return self.concatenate("games", "length")
+
+    def actions(self):
+        return self.concatenate("moves", "action")
+
+    def values(self):
+        return self.concatenate("moves", "value")
+
+    # Visit counts of every move that has them, with moves numbered across
+    # the whole dataset like actions() and values().
+    def visits(self):
+        moves = [
+            chunk.visits["move"] + start
+            for chunk, start in zip(self.chunks, self.chunk_move_starts)
+        ]
+        return (
+            np.concatenate(moves) if moves else np.zeros(0, np.int64),
+            self.concatenate("visits", "action"),
+            self.concatenate("visits", "count"),
+        )
+
+    # The chunk of move i of the dataset, and the index of the move within
+    # that chunk's moves and visits.
+    def locate_move(self, i):
+        if not 0 <= i < self.move_count():
+            raise IndexError(f"move {i} out of range for {self.move_count()} moves")
+        c = int(np.searchsorted(self.chunk_move_starts, i, side="right")) - 1
+        return c, int(i - self.chunk_move_starts[c])
+
+    # Move i of the dataset: the game it belongs to, its ply within the game,
+    # its action and value, and the actions and counts of its visits (empty
+    # when none were recorded).
+    def move(self, i):
+        c, offset = self.locate_move(i)
+        chunk = self.chunks[c]
+        game = int(np.searchsorted(chunk.games["offset"], offset, side="right")) - 1
+        move = chunk.moves[offset]
+        start, end = np.searchsorted(chunk.visits["move"], [offset, offset + 1])
+        visits = chunk.visits[start:end]
+        return (
+            int(self.chunk_starts[c]) + game,
+            offset - int(chunk.games["offset"][game]),
+            int(move["action"]),
+            float(move["value"]),
+            visits["action"],
+            visits["count"],
+        )
+
+    def game(self, i):
+        c = int(np.searchsorted(self.chunk_starts, i, side="right")) - 1
+        chunk = self.chunks[c]
+        game = chunk.games[i - self.chunk_starts[c]]
+        moves = chunk.moves[game["offset"] : game["offset"] + game["length"]]
+        return (
+            game["board"].reshape(self.board_size, self.board_size),
+            int(game["turn"]),
+            int(game["winner"]),
+            moves["action"],
+            moves["value"],
+        )
+
+
+# Plays games on a BatchedOverboard and writes every finished game. The
+# actions of each board are kept in a fixed (batch, max_moves) buffer so
+# that finished games are written with array operations only.
+def write_self_play(writer: GameWriter, games, policy, batch_size=1024, seed=None):
+    env = BatchedOverboard(batch_size, writer.board_size, seed)
+    initial = env.boards.copy()
+    actions = np.zeros((batch_size, env.max_moves), dtype=np.int32)
+    rows = np.arange(batch_size)
+
+    written = 0
+    while written < games:
+        step_actions = policy(env)
+        actions[rows, env.moves] = step_actions
+        lengths = env.moves + 1
+
+        winners, done = env.step(step_actions)
+        finished = np.flatnonzero(done)[: games - written]
+        if len(finished):
+            writer.add_games(
+                initial[finished],
+                actions[finished],
+                lengths[finished],
+                winners[finished],
+            )
+            written += len(finished)
+            initial[done] = env.boards[done]
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--games", type=int, default=100_000)
+    parser.add_argument("--board-size", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--policy", choices=["random", "greedy"], default="greedy")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policy = {
+        "random": BatchedOverboard.random_actions,
+        "greedy": BatchedOverboard.greedy_actions,
+    }[args.policy]
+
+    started = time.perf_counter()
+    with GameWriter(args.directory, args.board_size, args.chunk_size) as writer:
+        write_self_play(writer, args.games, policy, args.batch_size, args.seed)
+    seconds = time.perf_counter() - started
+    print(
+        f"Wrote {args.games:,} games in {seconds:.1f}s ({args.games / seconds:,.0f} games/s)"
+    )
+
+    started = time.perf_counter()
+    reader = GameReader(args.directory)
+    moves = len(reader.actions())
+    seconds = time.perf_counter() - started
+    print(f"Read {len(reader):,} games, {moves:,} moves in {seconds:.2f}s")
@@ -0,0 +1,354 @@
+import functools
+import time
+from collections import namedtuple
+import numpy as np
+from evaluation import MaterialEvaluator
+from overboard import Overboard
+from symmetry import canonical_key, inverse, transform_move
+from transposition import TranspositionTable
+
+SearchResult = namedtuple(
+    "SearchResult", ["move", "value", "depth", "principal_variation", "stats"]
+)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class AlphaBetaSearch:
+    WIN_SCORE = 999
+    KILLERS_PER_PLY = 2
+    TIME_CHECK_INTERVAL = 256
+    MAX_PLY = 100
+
+    def __init__(
+        self,
+        max_depth=5,
+        time_limit=None,
+        transposition_table=None,
+        tablebase=None,
+        symmetric=False,
+        evaluator=None,
+    ):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.transposition_table = transposition_table
+        self.tablebase = tablebase
+        self.symmetric = symmetric
+        self.evaluator = evaluator or MaterialEvaluator()
+
+    def evaluate(self, overboard: Overboard):
+        return self.evaluator.evaluate(overboard)
+
+    # Values of positions that need no search: finished games and, below the
+    # root, positions with few enough pieces to look up in the tablebase.
+    def exact_value(self, overboard: Overboard, ply):
+        winner = overboard.get_winner()
+        if winner is not None:
+            score = self.WIN_SCORE - ply
+            return score if winner == overboard.turn else -score
+
+        if ply > 0 and self.tablebase is not None:
+            entry = self.tablebase.probe(overboard)
+            if entry is not None:
+                self.stats["tablebase_hits"] += 1
+                result, distance = entry
+                if result == self.tablebase.DRAW:
+                    return 0
+                score = self.WIN_SCORE - ply - distance
+                return score if result == self.tablebase.WIN else -score
+
+        return None
+
+    # Scores all children of a frontier node with one call to a batched
+    # evaluator, from the point of view of the node.
+    def evaluate_children(self, overboard: Overboard, moves, ply):
+        values = [None] * len(moves)
+        pending, boards, turns, keys = [], [], [], []
+        for i, move in enumerate(moves):
+            overboard.make_move(move)
+            self.stats["nodes"] += 1
+            value = self.exact_value(overboard, ply + 1)
+            if value is None:
+                self.stats["leaves"] += 1
+                pending.append(i)
+                boards.append(overboard.board.copy())
+                turns.append(overboard.turn)
+                keys.append(overboard.hash)
+            else:
+                values[i] = -value
+            overboard.unmake_move()
+
+        if pending:
+            scores = self.evaluator.evaluate_many(
+                np.array(boards), np.array(turns), keys
+            )
+            for i, score in zip(pending, np.asarray(scores).tolist()):
+                values[i] = -score
+        return values
+
+    # Values are returned from white's point of view, like min_max, so that
+    # results are comparable no matter whose turn it is. An optional
+    # (low, high) window, also from white's point of view, narrows the root
+    # search; values outside it are only bounds on the true value.
+    def search(self, overboard: Overboard, window=None):
+        started = time.perf_counter()
+        self.deadline = None if self.time_limit is None else started + self.time_limit
+        self.next_time_check = self.TIME_CHECK_INTERVAL
+        self.killers = [[] for _ in range(self.max_depth + 1)]
+        self.history = {}
+        self.principal_variation = []
+        self.stats = {
+            "nodes": 0,
+            "leaves": 0,
+            "cutoffs": 0,
+            "depth": 0,
+            "time": 0.0,
+            "iterations": [],
+            "tablebase_hits": 0,
+            "generated": 0,
+        }
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+
+        alpha, beta = -self.WIN_SCORE - 1, self.WIN_SCORE + 1
+        if window is not None:
+            low, high = window
+            alpha, beta = (
+                (low, high)
+                if overboard.turn == Overboard.PLAYER_WHITE
+                else (-high, -low)
+            )
+
+        root_history = len(overboard.history)
+        best_move, best_value = None, None
+        for depth in range(1, self.max_depth + 1):
+            nodes = self.stats["nodes"]
+            self.pv_table = [[] for _ in range(depth + 1)]
+            try:
+                value = self.negamax(overboard, depth, 0, alpha, beta)
+            except SearchTimeout:
+                while len(overboard.history) > root_history:
+                    overboard.unmake_move()
+                break
+
+            self.principal_variation = self.pv_table[0]
+            if self.principal_variation:
+                best_move = self.principal_variation[0]
+            best_value = value if overboard.turn == Overboard.PLAYER_WHITE else -value
+
+            self.stats["depth"] = depth
+            self.stats["iterations"].append(
+                {
+                    "depth": depth,
+                    "nodes": self.stats["nodes"] - nodes,
+                    "time": time.perf_counter() - started,
+                    "value": best_value,
+                }
+            )
+
+            if abs(value) >= self.WIN_SCORE - self.max_depth:
+                break
+
+        self.stats["time"] = time.perf_counter() - started
+        if self.transposition_table is not None:
+            self.stats["transposition"] = self.transposition_table.stats()
+        return SearchResult(
+            best_move,
+            best_value,
+            self.stats["depth"],
+            self.principal_variation,
+            self.stats,
+        )
+
+    def negamax(self, overboard: Overboard, depth, ply, alpha, beta):
+        self.stats["nodes"] += 1
+        if (
+            self.deadline is not None
+            and ply > 0
+            and self.stats["depth"] > 0
+            and self.stats["nodes"] >= self.next_time_check
+        ):
+            # Batched frontier nodes count all their children at once, so
+            # the node count can step over any fixed multiple.
+            self.next_time_check = self.stats["nodes"] + self.TIME_CHECK_INTERVAL
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+
+        self.pv_table[ply] = []
+
+        value = self.exact_value(overboard, ply)
+        if value is not None:
+            return value
+
+        if depth == 0:
+            self.stats["leaves"] += 1
+            return self.evaluate(overboard)
+
+        table = self.transposition_table
+        table_move = None
+        alpha_original = alpha
+        if table is not None:
+            position_key, symmetry = self.table_key(overboard)
+            entry = table.probe(position_key)
+            if entry is not None:
+                table_move = entry.move
+                if symmetry and table_move is not None:
+                    table_move = transform_move(
+                        table_move, inverse(symmetry), overboard.board_size
+                    )
+                if ply > 0 and entry.depth >= depth:
+                    value = self.value_from_table(entry.value, ply)
+                    if entry.bound == TranspositionTable.EXACT:
+                        return value
+                    if entry.bound == TranspositionTable.LOWER_BOUND:
+                        alpha = max(alpha, value)
+                    else:
+                        beta = min(beta, value)
+                    if alpha >= beta:
+                        return value
+
+        # Batched evaluators score the children of a frontier node together,
+        # one stage of moves at a time, so a cutoff among the captures still
+        # saves generating the quiet moves.
+        batched = depth == 1 and self.evaluator.batched
+        best_value = -(self.WIN_SCORE - ply)
+        best_move = None
+        for moves in self.move_stages(overboard, ply, table_move):
+            leaf_values = (
+                self.evaluate_children(overboard, moves, ply) if batched else None
+            )
+            for i, move in enumerate(moves):
+                if leaf_values is None:
+                    overboard.make_move(move)
+                    value = -self.negamax(overboard, depth - 1, ply + 1, -beta, -alpha)
+                    overboard.unmake_move()
+                else:
+                    value = leaf_values[i]
+                    self.pv_table[ply + 1] = []
+
+                if value > best_value:
+                    best_value = value
+                    best_move = move
+                if value > alpha:
+                    alpha = value
+                    self.pv_table[ply] = [move] + self.pv_table[ply + 1]
+                if alpha >= beta:
+                    self.stats["cutoffs"] += 1
+                    if move.captures == 0:
+                        self.store_killer(move, ply)
+                        key = (move.start, move.end)
+                        self.history[key] = self.history.get(key, 0) + depth * depth
+                    break
+            if alpha >= beta:
+                break
+
+        if table is not None:
+            if best_value <= alpha_original:
+                bound = TranspositionTable.UPPER_BOUND
+            elif best_value >= beta:
+                bound = TranspositionTable.LOWER_BOUND
+            else:
+                bound = TranspositionTable.EXACT
+            if symmetry and best_move is not None:
+                best_move = transform_move(best_move, symmetry, overboard.board_size)
+            table.store(
+                position_key,
+                depth,
+                self.value_to_table(best_value, ply),
+                bound,
+                best_move,
+            )
+
+        return best_value
+
+    # With symmetric keys, all 16 rotations, reflections and colour swaps of
+    # a position share one entry. Entry moves are kept in the frame of the
+    # canonical position and mapped back when probed.
+    def table_key(self, overboard: Overboard):
+        if self.symmetric:
+            return canonical_key(overboard)
+        return overboard.hash, 0
+
+    # Win scores depend on the distance from the root, so they are stored
+    # relative to the node and shifted back when probed at another ply.
+    def value_to_table(self, value, ply):
+        if value >= self.WIN_SCORE - self.MAX_PLY:
+            return value + ply
+        if value <= -(self.WIN_SCORE - self.MAX_PLY):
+            return value - ply
+        return value
+
+    def value_from_table(self, value, ply):
+        if value >= self.WIN_SCORE - self.MAX_PLY:
+            return value - ply
+        if value <= -(self.WIN_SCORE - self.MAX_PLY):
+            return value + ply
+        return value
+
+    # Yields the moves in two lists: first the transposition table and
+    # principal variation moves, captures by the number of pieces pushed off
+    # and killer moves, then the remaining quiet moves by history. Quiet
+    # moves are only generated once every move of the first list has been
+    # searched without a cutoff.
+    def move_stages(self, overboard: Overboard, ply, table_move=None):
+        pv_move = (
+            self.principal_variation[ply]
+            if ply < len(self.principal_variation)
+            else None
+        )
+
+        captures = sorted(
+            overboard.iter_captures(), key=lambda move: move.captures, reverse=True
+        )
+        self.stats["generated"] += len(captures)
+
+        first = []
+        for move in (table_move, pv_move):
+            if move is None or move in first:
+                continue
+            if move in captures or overboard.is_legal_quiet_move(move):
+                first.append(move)
+        searched = list(first)
+        first.extend(move for move in captures if move not in searched)
+        for move in self.killers[ply]:
+            if move not in searched and overboard.is_legal_quiet_move(move):
+                searched.append(move)
+                first.append(move)
+        yield first
+
+        quiet = [move for move in overboard.iter_quiet_moves() if move not in searched]
+        self.stats["generated"] += len(quiet)
+        quiet.sort(
+            key=lambda move: self.history.get((move.start, move.end), 0), reverse=True
+        )
+        yield quiet
+
+    def store_killer(self, move, ply):
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.KILLERS_PER_PLY :]
+
+
+def alpha_beta_move(search: AlphaBetaSearch, overboard: Overboard):
+    move = search.search(overboard).move
+    return (move.start, move.end)
+
+
+# Agents are partials of module-level functions so tournament workers can
+# pickle them.
+def alpha_beta_agent(
+    max_depth=5,
+    time_limit=None,
+    table_size=None,
+    tablebase=None,
+    symmetric=False,
+    evaluator=None,
+):
+    table = None if table_size is None else TranspositionTable(table_size)
+    return functools.partial(
+        alpha_beta_move,
+        AlphaBetaSearch(max_depth, time_limit, table, tablebase, symmetric, evaluator),
+    )
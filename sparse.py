@@ -0,0 +1,303 @@
+import functools
+import random
+import numpy as np
+from bitboard import line_reach, line_slides, slide_line
+from overboard import GameState, Overboard, zobrist_keys
+
+# Every row and every column is kept as a pair of integers, one bit per
+# square for the white and the red pieces on it. Finding the moves of a
+# piece only looks at its own row and column, so move generation costs the
+# same per piece on any board size. Unlike BitboardOverboard, lines are not
+# packed into one word, so there is no limit on the board size.
+#
+# A move costs a few line operations plus, for every square whose contents
+# change, one update of the crossing line and one Zobrist key. Nothing else
+# is kept per square: piece positions are read off the rows when needed.
+# A slide pushes everything up to the first gap along, and on a crowded
+# board that is most of the line, so the per-move cost does grow with the
+# board: on the corpus of benchmark.py --scaling a move changes 3.5 squares
+# on 8x8 and 9 on 32x32, and make_move is about that much slower.
+
+
+# The Zobrist keys of the squares of every row and every column, in order.
+@functools.lru_cache
+def line_keys(board_size):
+    pieces, _ = zobrist_keys(board_size)
+    return {
+        player: (
+            [keys[r * board_size : (r + 1) * board_size] for r in range(board_size)],
+            [keys[c::board_size] for c in range(board_size)],
+        )
+        for player, keys in pieces.items()
+    }
+
+
+def pack_lines(mask):
+    packed = np.packbits(mask, axis=1, bitorder="little")
+    return [int.from_bytes(line.tobytes(), "little") for line in packed]
+
+
+def unpack_lines(lines, board_size):
+    bytes_per_line = (board_size + 7) // 8
+    packed = np.frombuffer(
+        b"".join(line.to_bytes(bytes_per_line, "little") for line in lines),
+        dtype=np.uint8,
+    ).reshape(len(lines), bytes_per_line)
+    return np.unpackbits(packed, axis=1, bitorder="little")[:, :board_size]
+
+
+class SparseOverboard(Overboard):
+    @staticmethod
+    def from_numpy(board, turn=Overboard.PLAYER_WHITE):
+        assert board.shape[0] == board.shape[1]
+
+        overboard = SparseOverboard(board_size=board.shape[0])
+        overboard.initialize(board, turn)
+        return overboard
+
+    @property
+    def board(self):
+        if self._board is None:
+            self._board = (
+                unpack_lines(self.rows[self.PLAYER_WHITE], self.board_size)
+                * self.PLAYER_WHITE
+                + unpack_lines(self.rows[self.PLAYER_RED], self.board_size)
+                * self.PLAYER_RED
+            ).astype(int)
+            self._board.flags.writeable = False
+        return self._board
+
+    def reset(self):
+        self.initialized = False
+        self.rows = {
+            self.PLAYER_WHITE: [0] * self.board_size,
+            self.PLAYER_RED: [0] * self.board_size,
+        }
+        self.cols = {
+            self.PLAYER_WHITE: [0] * self.board_size,
+            self.PLAYER_RED: [0] * self.board_size,
+        }
+        self._board = None
+        self.turn = self.PLAYER_WHITE
+        self.history = []
+        self.compute_hash()
+        self.compute_counters()
+
+    # Draws from the global generator exactly like Overboard, so that the
+    # same seed gives the same start on every engine.
+    def initialize_randomly(self):
+        piece_count = self.board_size**2 // 2
+
+        pieces = [self.PLAYER_WHITE] * piece_count + [self.PLAYER_RED] * piece_count
+        random.shuffle(pieces)
+
+        self.initialize(
+            np.array(pieces).reshape(self.board_size, self.board_size),
+            self.PLAYER_WHITE,
+        )
+
+    def initialize(self, board, turn):
+        assert board.shape[0] % 2 == 0
+        assert board.shape[0] == board.shape[1]
+
+        self.board_size = board.shape[0]
+        self.reset()
+        self.initialized = True
+
+        for player in [self.PLAYER_WHITE, self.PLAYER_RED]:
+            self.rows[player] = pack_lines(board == player)
+            self.cols[player] = pack_lines((board == player).T)
+        self.turn = turn
+        self.compute_hash()
+        self.compute_counters()
+
+    def compute_hash(self):
+        self.zobrist_pieces, self.zobrist_turn = zobrist_keys(self.board_size)
+        self.line_keys = line_keys(self.board_size)
+
+        self.hash = 0 if self.turn == self.PLAYER_WHITE else self.zobrist_turn
+        for player in [self.PLAYER_WHITE, self.PLAYER_RED]:
+            keys = self.zobrist_pieces[player]
+            for r, line in enumerate(self.rows[player]):
+                while line:
+                    bit = line & -line
+                    self.hash ^= keys[r * self.board_size + bit.bit_length() - 1]
+                    line ^= bit
+
+    # Positions are read off the rows when needed rather than kept in sets,
+    # so moves only update the lines.
+    def compute_counters(self):
+        self.piece_counts = {
+            player: sum(line.bit_count() for line in self.rows[player])
+            for player in [self.PLAYER_WHITE, self.PLAYER_RED]
+        }
+
+    def get_state(self):
+        n = self.board_size
+        return GameState(
+            n,
+            sum(line << (r * n) for r, line in enumerate(self.rows[self.PLAYER_WHITE])),
+            sum(line << (r * n) for r, line in enumerate(self.rows[self.PLAYER_RED])),
+            self.turn,
+            self.hash,
+        )
+
+    def set_state(self, state: GameState):
+        self.board_size = state.board_size
+        self.rows = {}
+        self.cols = {}
+        self.piece_counts = {}
+        for player, bitboard in [
+            (self.PLAYER_WHITE, state.white),
+            (self.PLAYER_RED, state.red),
+        ]:
+            cols = [0] * self.board_size
+            for r, c in state.squares(bitboard):
+                cols[c] |= 1 << r
+            self.rows[player] = state.rows(bitboard)
+            self.cols[player] = cols
+            self.piece_counts[player] = bitboard.bit_count()
+
+        self.zobrist_pieces, self.zobrist_turn = zobrist_keys(self.board_size)
+        self.line_keys = line_keys(self.board_size)
+        self.hash = state.hash
+        self.turn = state.turn
+        self.history = []
+        self._board = None
+        self.initialized = True
+
+    def check_counters(self):
+        expected = Overboard.from_numpy(self.board, self.turn)
+        assert self.hash == expected.hash
+        assert self.piece_counts == expected.piece_counts
+        for player in [self.PLAYER_WHITE, self.PLAYER_RED]:
+            assert self.cols[player] == pack_lines((self.board == player).T)
+
+    def is_own_piece(self, position):
+        row, col = position
+        return bool(self.rows[self.turn][row] >> col & 1)
+
+    def get_player_piece_positions(self):
+        assert self.initialized == True
+
+        positions = []
+        for r, line in enumerate(self.rows[self.turn]):
+            while line:
+                bit = line & -line
+                positions.append((r, bit.bit_length() - 1))
+                line ^= bit
+        return positions
+
+    def get_line(self, position, axis):
+        if axis == (0, 1):
+            return (
+                self.rows[self.PLAYER_WHITE][position[0]],
+                self.rows[self.PLAYER_RED][position[0]],
+            )
+        return (
+            self.cols[self.PLAYER_WHITE][position[1]],
+            self.cols[self.PLAYER_RED][position[1]],
+        )
+
+    def get_line_reach(self, line, index, direction):
+        white_line, red_line = line
+        own_line = white_line if self.turn == self.PLAYER_WHITE else red_line
+        return line_reach(
+            own_line, white_line | red_line, self.board_size, index, direction
+        )
+
+    def get_slides_for_piece(self, piece_position, valid_only=True):
+        row, col = map(int, piece_position)
+        assert self.is_own_piece((row, col))
+
+        size = self.board_size
+        white_to_move = self.turn == self.PLAYER_WHITE
+        row_white, row_red = self.get_line((row, col), (0, 1))
+        col_white, col_red = self.get_line((row, col), (1, 0))
+
+        slides = []
+        for direction in (-1, +1):
+            for i, preview, valid in line_slides(
+                size, white_to_move, row_white, row_red, col, direction
+            ):
+                if valid or not valid_only:
+                    slides.append(((row, i), preview, valid))
+        for direction in (-1, +1):
+            for i, preview, valid in line_slides(
+                size, white_to_move, col_white, col_red, row, direction
+            ):
+                if valid or not valid_only:
+                    slides.append(((i, col), preview, valid))
+
+        return slides
+
+    # Replaces the contents of one line, and updates the crossing lines and
+    # the hash for only the squares that changed.
+    def set_line(self, vertical, line, white_line, red_line):
+        lines, crossing = (self.cols, self.rows) if vertical else (self.rows, self.cols)
+        bit = 1 << line
+        for player, new_line in [
+            (self.PLAYER_WHITE, white_line),
+            (self.PLAYER_RED, red_line),
+        ]:
+            keys = self.line_keys[player][vertical][line]
+            crossing_lines = crossing[player]
+            toggled = lines[player][line] ^ new_line
+            while toggled:
+                low = toggled & -toggled
+                i = low.bit_length() - 1
+                crossing_lines[i] ^= bit
+                self.hash ^= keys[i]
+                toggled ^= low
+            lines[player][line] = new_line
+        self._board = None
+
+    def make_move(self, start_position, end_position=None):
+        move = (
+            start_position
+            if end_position is None
+            else self.get_move(start_position, end_position)
+        )
+
+        (r, c), (dr, dc) = move.start, move.direction
+        steps = abs(move.end[0] - r) + abs(move.end[1] - c)
+        vertical = dr != 0
+        line, index, direction = (c, r, dr) if vertical else (r, c, dc)
+        white_line, red_line = self.get_line(move.start, (1, 0) if vertical else (0, 1))
+
+        self.history.append((move, white_line, red_line, self.hash))
+        if steps:
+            self.set_line(
+                vertical,
+                line,
+                *slide_line(
+                    white_line, red_line, self.board_size, index, direction, steps
+                ),
+            )
+        self.hash ^= self.zobrist_turn
+
+        self.turn = (
+            self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
+        )
+        self.piece_counts[self.turn] -= move.captures
+
+        if self.debug:
+            self.check_counters()
+        return move
+
+    def unmake_move(self):
+        move, white_line, red_line, saved_hash = self.history.pop()
+
+        (r, c), (dr, _) = move.start, move.direction
+        vertical = dr != 0
+        self.set_line(vertical, c if vertical else r, white_line, red_line)
+        self.hash = saved_hash
+
+        self.piece_counts[self.turn] += move.captures
+        self.turn = (
+            self.PLAYER_WHITE if self.turn == self.PLAYER_RED else self.PLAYER_RED
+        )
+
+        if self.debug:
+            self.check_counters()
+        return move
@@ -0,0 +1,112 @@
+import functools
+import numpy as np
+from overboard import Move, Overboard, zobrist_keys
+
+# The rules do not change when the board is rotated or mirrored, so each of
+# the 8 symmetries of the square gives an equivalent position. Symmetry t
+# transposes the board when t & 4, then flips the rows when t & 1 and the
+# columns when t & 2.
+SYMMETRIES = 8
+
+
+def transform_square(square, symmetry, board_size):
+    r, c = square
+    if symmetry & 4:
+        r, c = c, r
+    if symmetry & 1:
+        r = board_size - 1 - r
+    if symmetry & 2:
+        c = board_size - 1 - c
+    return r, c
+
+
+def transform_direction(direction, symmetry):
+    dr, dc = direction
+    if symmetry & 4:
+        dr, dc = dc, dr
+    if symmetry & 1:
+        dr = -dr
+    if symmetry & 2:
+        dc = -dc
+    return dr, dc
+
+
+def transform_move(move, symmetry, board_size):
+    return Move(
+        transform_square(move.start, symmetry, board_size),
+        transform_square(move.end, symmetry, board_size),
+        transform_direction(move.direction, symmetry),
+        move.captures,
+    )
+
+
+# (0, 1) lies on no mirror axis of a 4x4 board, so every symmetry moves it
+# somewhere else and only the inverse brings it back.
+def inverse(symmetry):
+    return next(
+        s
+        for s in range(SYMMETRIES)
+        if transform_square(transform_square((0, 1), symmetry, 4), s, 4) == (0, 1)
+    )
+
+
+# gathers[t][s] is the square that lands on square s under symmetry t, so
+# board.flat[gathers[t]] is the transformed board.
+@functools.lru_cache
+def square_gathers(board_size):
+    gathers = np.zeros((SYMMETRIES, board_size**2), dtype=np.intp)
+    for symmetry in range(SYMMETRIES):
+        for r in range(board_size):
+            for c in range(board_size):
+                target = transform_square((r, c), symmetry, board_size)
+                gathers[symmetry, target[0] * board_size + target[1]] = (
+                    r * board_size + c
+                )
+    return gathers
+
+
+# Zobrist keys as an array indexed by (piece, square), with zero rows for
+# empty squares so a whole board hashes in one gather.
+@functools.lru_cache
+def zobrist_array(board_size):
+    pieces, _ = zobrist_keys(board_size)
+    keys = np.zeros((3, board_size**2), dtype=np.uint64)
+    keys[Overboard.PLAYER_WHITE] = pieces[Overboard.PLAYER_WHITE]
+    keys[Overboard.PLAYER_RED] = pieces[Overboard.PLAYER_RED]
+    return keys
+
+
+# Swapping the colours and the side to move does not change who wins, so
+# positions are first seen from the side to move, as if it were white.
+COLOR_SWAP = np.array(
+    [Overboard.EMPTY, Overboard.PLAYER_RED, Overboard.PLAYER_WHITE], dtype=np.intp
+)
+
+
+def symmetric_boards(board, turn):
+    size = len(board)
+    flat = board.ravel()
+    if turn == Overboard.PLAYER_RED:
+        flat = COLOR_SWAP[flat]
+
+    boards = flat[square_gathers(size)]
+    hashes = np.bitwise_xor.reduce(
+        zobrist_array(size)[boards, np.arange(size**2)], axis=1
+    )
+    return boards, hashes
+
+
+# Returns a key shared by all 16 equivalent positions, and the symmetry that
+# takes this position to the one the key stands for. Keys are Zobrist hashes
+# of that position with white to move, so values must be from the side to
+# move's point of view to be shared between them.
+def canonical_key(overboard: Overboard):
+    _, hashes = symmetric_boards(overboard.board, overboard.turn)
+    symmetry = int(np.argmin(hashes))
+    return int(hashes[symmetry]), symmetry
+
+
+def canonical_board(board, turn):
+    boards, hashes = symmetric_boards(board, turn)
+    symmetry = int(np.argmin(hashes))
+    return boards[symmetry].reshape(board.shape), symmetry
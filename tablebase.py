@@ -0,0 +1,273 @@
+import argparse
+import itertools
+import math
+import time
+import numpy as np
+from bitboard import STRIDE, BitboardOverboard
+from overboard import Overboard
+
+
+def combination_rank(squares):
+    # Squares must be sorted; this is the combinatorial number system, which
+    # numbers the k-subsets of range(n) as 0 .. C(n, k) - 1.
+    return sum(math.comb(square, i + 1) for i, square in enumerate(squares))
+
+
+def bitboard_squares(bitboard, board_size):
+    squares = []
+    while bitboard:
+        bit = bitboard & -bitboard
+        r, c = divmod(bit.bit_length() - 1, STRIDE)
+        squares.append(r * board_size + c)
+        bitboard ^= bit
+    return squares
+
+
+def squares_bitboard(squares, board_size):
+    bitboard = 0
+    for square in squares:
+        r, c = divmod(square, board_size)
+        bitboard |= 1 << (r * STRIDE + c)
+    return bitboard
+
+
+# Results of every position with up to max_pieces pieces on the board, from
+# the side to move's point of view, with the number of moves (plies) until
+# the game ends when the winner hurries and the loser stalls. Positions are
+# grouped by (white pieces, red pieces); within a group they are numbered by
+# the white squares, then the red squares among the squares left over.
+class Tablebase:
+    WIN = 1
+    DRAW = 0
+    LOSS = -1
+
+    # Version 2 only stores positions with white to move.
+    FORMAT_VERSION = 2
+
+    def __init__(self, board_size, max_pieces, values=None):
+        self.board_size = board_size
+        self.max_pieces = max_pieces
+        self.values = values
+
+        squares = board_size**2
+        self.offsets = {}
+        offset = 0
+        for white, red in self.piece_counts():
+            self.offsets[white, red] = offset
+            offset += math.comb(squares, white) * math.comb(squares - white, red)
+        self.size = offset
+
+        if values is None:
+            self.values = np.zeros(self.size, dtype=np.int16)
+        if len(self.values) != self.size:
+            raise ValueError(
+                f"A {board_size}x{board_size} tablebase with up to {max_pieces} "
+                f"pieces has {self.size} positions, got {len(self.values)} values"
+            )
+
+    def piece_counts(self):
+        return [
+            (white, red)
+            for white in range(self.max_pieces + 1)
+            for red in range(self.max_pieces + 1 - white)
+            if white or red
+        ]
+
+    def index(self, white_squares, red_squares, turn):
+        # Only white to move is stored: with red to move, the position with
+        # the colours swapped has the same result (see symmetry.COLOR_SWAP).
+        if turn == Overboard.PLAYER_RED:
+            white_squares, red_squares = red_squares, white_squares
+
+        squares = self.board_size**2
+        white, red = len(white_squares), len(red_squares)
+
+        # Red squares are numbered among the squares white leaves free.
+        free_squares = [
+            square - sum(1 for w in white_squares if w < square)
+            for square in red_squares
+        ]
+        return (
+            self.offsets[white, red]
+            + combination_rank(white_squares) * math.comb(squares - white, red)
+            + combination_rank(free_squares)
+        )
+
+    def covers(self, overboard: Overboard):
+        return (
+            overboard.board_size == self.board_size
+            and overboard.get_piece_count(Overboard.PLAYER_WHITE)
+            + overboard.get_piece_count(Overboard.PLAYER_RED)
+            <= self.max_pieces
+        )
+
+    # Returns (result, distance) for the side to move, or None when the
+    # position has too many pieces for the table.
+    def probe(self, overboard: Overboard):
+        if not self.covers(overboard):
+            return None
+
+        board = overboard.board.ravel()
+        value = int(
+            self.values[
+                self.index(
+                    np.flatnonzero(board == Overboard.PLAYER_WHITE).tolist(),
+                    np.flatnonzero(board == Overboard.PLAYER_RED).tolist(),
+                    overboard.turn,
+                )
+            ]
+        )
+        if value > 0:
+            return self.WIN, value - 1
+        if value < 0:
+            return self.LOSS, -value - 1
+        return self.DRAW, None
+
+    # Stored as one int16 array: -FORMAT_VERSION, the board size and piece
+    # limit, then one value per position, d + 1 for a win in d moves,
+    # -(d + 1) for a loss in d moves and 0 for a draw. Loading memory-maps
+    # the file, so only the pages that are probed are ever read.
+    def save(self, path):
+        header = np.array(
+            [-self.FORMAT_VERSION, self.board_size, self.max_pieces], dtype=np.int16
+        )
+        np.save(path, np.concatenate([header, self.values]))
+
+    @staticmethod
+    def load(path):
+        data = np.load(path, mmap_mode="r")
+        # Version 1 files start with the board size, so they read as version
+        # 1 here, and they index positions with either side to move.
+        version = -int(data[0]) if data[0] < 0 else 1
+        if version != Tablebase.FORMAT_VERSION:
+            raise ValueError(
+                f"{path} is a version {version} tablebase, but version "
+                f"{Tablebase.FORMAT_VERSION} is needed; build it again"
+            )
+        return Tablebase(int(data[1]), int(data[2]), data[3:])
+
+    def positions(self):
+        squares = self.board_size**2
+        for white, red in self.piece_counts():
+            for white_squares in itertools.combinations(range(squares), white):
+                free = [s for s in range(squares) if s not in white_squares]
+                for red_indices in itertools.combinations(range(len(free)), red):
+                    yield white_squares, [
+                        free[i] for i in red_indices
+                    ], Overboard.PLAYER_WHITE
+
+    # Retrograde analysis over the move graph of every position in the
+    # table. Captures only ever lower the piece count, so the graph is
+    # closed. Games that end are solved backwards from their last move, one
+    # distance at a time; whatever is left can be kept going forever by both
+    # sides and is a draw.
+    @staticmethod
+    def build(board_size, max_pieces, progress=None):
+        table = Tablebase(board_size, max_pieces)
+
+        overboard = BitboardOverboard(board_size)
+        solved = np.zeros(table.size, dtype=bool)
+        degree = np.zeros(table.size, dtype=np.int32)
+        owners, children = [], []
+
+        for n, (white_squares, red_squares, turn) in enumerate(table.positions()):
+            index = table.index(white_squares, red_squares, turn)
+            overboard.initialize_bitboards(
+                squares_bitboard(white_squares, board_size),
+                squares_bitboard(red_squares, board_size),
+                turn,
+            )
+
+            winner = overboard.get_winner()
+            moves = [] if winner is not None else list(overboard.iter_moves())
+            if not moves:
+                # The side to move has lost all its pieces, or is stuck,
+                # which counts as a loss like in BatchedOverboard.
+                table.values[index] = 1 if winner == turn else -1
+                solved[index] = True
+                continue
+
+            degree[index] = len(moves)
+            for move in moves:
+                overboard.make_move(move)
+                owners.append(index)
+                children.append(
+                    table.index(
+                        bitboard_squares(overboard.white, board_size),
+                        bitboard_squares(overboard.red, board_size),
+                        overboard.turn,
+                    )
+                )
+                overboard.unmake_move()
+
+            if progress is not None and n % 10000 == 0:
+                progress(n, table.size)
+
+        owners = np.array(owners, dtype=np.int64)
+        children = np.array(children, dtype=np.int64)
+
+        distance = 0
+        while True:
+            distance += 1
+            child_values = table.values[children]
+            child_solved = solved[children]
+
+            # A win in d needs a move into a loss in d - 1; a loss in d has
+            # every move leading into a win, the slowest of them in d - 1.
+            into_loss = child_solved & (child_values == -distance)
+            into_win = child_solved & (child_values > 0)
+            wins = ~solved & (
+                np.bincount(owners, weights=into_loss, minlength=table.size) > 0
+            )
+            losses = (
+                ~solved
+                & ~wins
+                & (degree > 0)
+                & (
+                    np.bincount(owners, weights=into_win, minlength=table.size)
+                    == degree
+                )
+            )
+            if not wins.any() and not losses.any():
+                break
+
+            table.values[wins] = distance + 1
+            table.values[losses] = -(distance + 1)
+            solved |= wins | losses
+
+        return table
+
+    def stats(self):
+        values = np.asarray(self.values)
+        return {
+            "positions": self.size,
+            "wins": int((values > 0).sum()),
+            "losses": int((values < 0).sum()),
+            "draws": int((values == 0).sum()),
+            "longest": int(np.abs(values).max()) - 1,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--board-size", type=int, default=4)
+    parser.add_argument("--pieces", type=int, default=4)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    output = (
+        args.output
+        or f"tablebase-{args.board_size}x{args.board_size}-{args.pieces}.npy"
+    )
+
+    started = time.perf_counter()
+    table = Tablebase.build(
+        args.board_size,
+        args.pieces,
+        progress=lambda n, total: print(f"{n}/{total} positions", end="\r"),
+    )
+    table.save(output)
+
+    print(f"Built {output} in {time.perf_counter() - started:.1f}s")
+    for name, value in table.stats().items():
+        print(f"{name}: {value}")
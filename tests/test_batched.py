@@ -0,0 +1,87 @@
+import numpy as np
+from overboard import Overboard
+from batched import BatchedOverboard
+
+
+def play_to_midgame(env, steps=6):
+    for _ in range(steps):
+        env.step(env.random_actions())
+
+
+def test_step_legality_matches_action_mask():
+    env = BatchedOverboard(256, 6, seed=1)
+    play_to_midgame(env)
+    rng = np.random.default_rng(2)
+    actions = rng.integers(0, env.legal_action_mask().shape[1], env.batch_size)
+    legal = env.legal_action_mask()[np.arange(env.batch_size), actions]
+    opponents = 3 - env.turns
+    before = env.boards.copy()
+
+    winners, done = env.step(actions)
+
+    assert (done[~legal]).all()
+    assert (winners[~legal] == opponents[~legal]).all()
+    finished = legal & done
+    assert (winners[finished] != opponents[finished]).all()
+    moved = legal & ~done
+    assert (env.boards[moved] != before[moved]).any(axis=(1, 2)).all()
+
+
+def test_illegal_action_forfeits_without_changing_counts():
+    env = BatchedOverboard(1, 4, seed=0)
+    env.boards[0] = [
+        [1, 2, 0, 0],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+        [0, 0, 2, 1],
+    ]
+    env.piece_counts[0] = [0, 2, 2]
+    red_piece = 1  # square (0, 1) belongs to red, and white is to move
+    illegal = red_piece * 4 * 3 + 1 * 3  # slide it right by one square
+    assert not env.legal_action_mask()[0, illegal]
+
+    winners, done = env.step(np.array([illegal]))
+
+    assert done[0]
+    assert winners[0] == Overboard.PLAYER_RED
+
+
+def test_pushing_own_piece_off_is_a_forfeit():
+    env = BatchedOverboard(1, 4, seed=0)
+    env.boards[0] = [
+        [1, 1, 0, 2],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+        [2, 0, 0, 1],
+    ]
+    env.piece_counts[0] = [0, 3, 2]
+    # Sliding (0, 0) right by three would push white's own (0, 1) off too.
+    action = (0 * 4 + 1) * 3 + 3 - 1
+    assert not env.legal_action_mask()[0, action]
+
+    winners, done = env.step(np.array([action]))
+
+    assert done[0]
+    assert winners[0] == Overboard.PLAYER_RED
+
+
+def test_captures_are_counted_by_colour():
+    env = BatchedOverboard(1, 4, seed=0)
+    # White slides (0, 0) right by two: the gap closes and the red piece at
+    # the end of the row goes off.
+    env.boards[0] = [
+        [1, 1, 0, 2],
+        [0, 0, 0, 0],
+        [0, 0, 0, 0],
+        [2, 0, 0, 1],
+    ]
+    env.piece_counts[0] = [0, 3, 2]
+    action = (0 * 4 + 1) * 3 + 2 - 1
+    assert env.legal_action_mask()[0, action]
+
+    winners, done = env.step(np.array([action]))
+
+    assert not done[0]
+    assert list(env.piece_counts[0]) == [0, 3, 1]
+    assert (env.boards[0] == Overboard.PLAYER_WHITE).sum() == 3
+    assert (env.boards[0] == Overboard.PLAYER_RED).sum() == 1
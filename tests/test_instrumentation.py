@@ -0,0 +1,68 @@
+import pytest
+from evaluation import CachedEvaluator, LinearEvaluator
+from instrumentation import EVALUATOR_METHODS, Profiler
+from overboard import Overboard
+from search import alpha_beta_agent
+from tournament import play_game
+
+
+def shared_evaluator_agents():
+    evaluator = CachedEvaluator(LinearEvaluator())
+    return (
+        evaluator,
+        alpha_beta_agent(max_depth=1, evaluator=evaluator),
+        alpha_beta_agent(max_depth=1, evaluator=evaluator),
+    )
+
+
+def test_shared_evaluator_is_wrapped_once():
+    evaluator, white, red = shared_evaluator_agents()
+    profiler = Profiler()
+    profiler.instrument_agent(white)
+    profiler.instrument_agent(red)
+    wrapped = evaluator.evaluate
+
+    profiler.instrument_agent(white)
+    assert evaluator.evaluate is wrapped
+
+    overboard = Overboard(4)
+    overboard.initialize_randomly()
+    evaluator.evaluate(overboard)
+    assert profiler.counters["evaluate"] == 1
+
+    profiler.restore()
+    profiler.restore()
+    assert not vars(evaluator).keys() & set(EVALUATOR_METHODS)
+    assert "search" not in vars(white.args[0])
+    assert "search" not in vars(red.args[0])
+
+
+def test_restore_keeps_attributes_set_before():
+    evaluator = LinearEvaluator()
+    own = evaluator.evaluate
+    evaluator.evaluate = own
+    profiler = Profiler()
+    profiler.instrument_agent(alpha_beta_agent(max_depth=1, evaluator=evaluator))
+    assert evaluator.evaluate is not own
+
+    profiler.restore()
+    assert evaluator.evaluate is own
+
+
+def test_failed_game_restores_agents():
+    evaluator, white, _ = shared_evaluator_agents()
+
+    def failing_move(overboard):
+        raise RuntimeError("agent failed")
+
+    with pytest.raises(RuntimeError):
+        play_game(white, failing_move, 0, 4, profile=True)
+    assert not vars(evaluator).keys() & set(EVALUATOR_METHODS)
+    assert "search" not in vars(white.args[0])
+
+
+def test_profiled_game_with_shared_evaluator():
+    evaluator, white, red = shared_evaluator_agents()
+    _, _, game = play_game(white, red, 0, 4, profile=True)
+    assert game["calls"]["evaluate_many"] > 0
+    assert not vars(evaluator).keys() & set(EVALUATOR_METHODS)
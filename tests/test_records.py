@@ -0,0 +1,74 @@
+import json
+import os
+import numpy as np
+import pytest
+from records import FORMAT_VERSION, GameReader, GameWriter
+
+
+def write_games(directory, board_size=4, chunk_size=2):
+    rng = np.random.default_rng(0)
+    games = []
+    with GameWriter(directory, board_size, chunk_size) as writer:
+        for g in range(5):
+            length = g + 1
+            board = rng.integers(0, 3, (board_size, board_size))
+            actions = list(range(10 * g, 10 * g + length))
+            values = [g + ply / 10 for ply in range(length)]
+            visits = [
+                (
+                    (np.array([action, action + 1]), np.array([ply + 1, g]))
+                    if ply % 2 == 0
+                    else None
+                )
+                for ply, action in enumerate(actions)
+            ]
+            writer.add_game(board, actions, 1, values=values, visits=visits)
+            games.append((actions, values, visits))
+    return games
+
+
+def test_move_lookup_across_chunks(tmp_path):
+    games = write_games(tmp_path)
+    reader = GameReader(tmp_path)
+    assert len(reader.chunks) == 3
+    assert reader.move_count() == len(reader.actions()) == 15
+
+    i = 0
+    for g, (actions, values, visits) in enumerate(games):
+        for ply, action in enumerate(actions):
+            game, move_ply, move_action, value, visit_actions, counts = reader.move(i)
+            assert (game, move_ply, move_action) == (g, ply, action)
+            assert value == pytest.approx(values[ply])
+            if visits[ply] is None:
+                assert len(visit_actions) == len(counts) == 0
+            else:
+                assert list(visit_actions) == list(visits[ply][0])
+                assert list(counts) == list(visits[ply][1])
+            i += 1
+
+    moves, visit_actions, counts = reader.visits()
+    assert list(reader.actions()[moves]) == [
+        action
+        for actions, _, visits in games
+        for action, move_visits in zip(actions, visits)
+        if move_visits is not None
+        for _ in range(2)
+    ]
+
+    with pytest.raises(IndexError):
+        reader.move(reader.move_count())
+
+
+def test_version_mismatch(tmp_path):
+    write_games(tmp_path)
+    path = os.path.join(tmp_path, "index.json")
+    with open(path) as f:
+        index = json.load(f)
+    index["version"] = FORMAT_VERSION + 1
+    with open(path, "w") as f:
+        json.dump(index, f)
+
+    with pytest.raises(ValueError, match=f"version {FORMAT_VERSION + 1}"):
+        GameReader(tmp_path)
+    with pytest.raises(ValueError):
+        GameWriter(tmp_path, 4)
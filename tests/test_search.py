@@ -0,0 +1,18 @@
+import random
+import time
+from evaluation import LinearEvaluator
+from overboard import Overboard
+from search import AlphaBetaSearch
+
+
+def test_time_limit_holds_with_batched_evaluator():
+    random.seed(2)
+    overboard = Overboard(8)
+    overboard.initialize_randomly()
+    search = AlphaBetaSearch(max_depth=8, time_limit=0.3, evaluator=LinearEvaluator())
+
+    started = time.perf_counter()
+    result = search.search(overboard)
+
+    assert result.move is not None
+    assert time.perf_counter() - started < 0.6
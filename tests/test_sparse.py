@@ -0,0 +1,47 @@
+import random
+import numpy as np
+import pytest
+from overboard import ReferenceOverboard
+from sparse import SparseOverboard
+
+
+@pytest.mark.parametrize("board_size", [4, 8, 12])
+def test_games_match_reference(board_size):
+    random.seed(board_size)
+    for _ in range(3):
+        sparse = SparseOverboard(board_size, debug=True)
+        sparse.initialize_randomly()
+        reference = ReferenceOverboard.from_numpy(sparse.board.copy(), sparse.turn)
+
+        for _ in range(4 * board_size):
+            if reference.get_winner() is not None:
+                break
+            moves = list(reference.iter_moves())
+            assert list(sparse.iter_moves()) == moves
+            assert (
+                sparse.get_player_piece_positions()
+                == reference.get_player_piece_positions()
+            )
+
+            move = random.choice(moves)
+            expected, _ = reference.get_preview_board(move.start, move.end)
+            actual, _ = sparse.get_preview_board(move.start, move.end)
+            assert np.array_equal(expected, actual)
+
+            reference.make_move(move)
+            sparse.make_move(move)
+            assert np.array_equal(reference.board, sparse.board)
+            assert sparse.hash == reference.hash
+            assert sparse.get_winner() == reference.get_winner()
+
+        state = sparse.get_state()
+        while reference.history:
+            reference.unmake_move()
+            sparse.unmake_move()
+            assert np.array_equal(reference.board, sparse.board)
+            assert sparse.hash == reference.hash
+
+        restored = SparseOverboard(board_size, debug=True)
+        restored.set_state(state)
+        restored.check_counters()
+        assert restored.get_state() == state
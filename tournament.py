@@ -0,0 +1,236 @@
+import argparse
+import functools
+import json
+import os
+import random
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import Profiler
+from overboard import Overboard
+from min_max import SIZE, random_move, greedy_move, min_max_move
+
+TournamentResult = namedtuple(
+    "TournamentResult", ["wins", "average_game_length", "games"]
+)
+
+
+def game_seeds(seed, games):
+    rng = random.Random(seed)
+    return [rng.getrandbits(32) for _ in range(games)]
+
+
+# Every game reseeds the global generator, which both initialize_randomly and
+# the random agents draw from, so a game's outcome depends only on its seed
+# and not on which process plays it or what ran before it. With profile set,
+# the engine is instrumented and a per-move and per-game summary is returned
+# as a third element.
+def play_game(
+    white_move, red_move, seed, board_size=SIZE, engine=Overboard, profile=False
+):
+    random.seed(seed)
+
+    overboard = engine(board_size=board_size)
+    overboard.initialize_randomly()
+    t = 0
+
+    profiler = None
+    if profile:
+        profiler = Profiler()
+        profiler.instrument(overboard)
+
+    try:
+        if profiler is not None:
+            profiler.instrument_agent(white_move)
+            profiler.instrument_agent(red_move)
+            profiler.begin_game()
+
+        while (winner := overboard.get_winner()) is None:
+            t += 1
+
+            if t > 2 * (board_size**2):
+                winner = 0
+                break
+
+            if profiler is not None:
+                profiler.begin_move()
+
+            if overboard.turn == Overboard.PLAYER_WHITE:
+                piece, move = white_move(overboard)
+            else:
+                piece, move = red_move(overboard)
+
+            if profiler is not None:
+                profiler.end_move(overboard.turn)
+
+            overboard.make_move(piece, move)
+
+        if profiler is not None:
+            return winner, t, profiler.end_game(winner, t)
+        return winner, t
+    finally:
+        # Agents outlive the game, so they are restored even if it fails.
+        if profiler is not None:
+            profiler.restore()
+
+
+def play_game_task(task):
+    return play_game(*task)
+
+
+def summarize(outcomes):
+    average_game_length = 0
+    wins = {Overboard.PLAYER_WHITE: 0, Overboard.PLAYER_RED: 0, 0: 0}
+
+    for e, (winner, t, *_) in enumerate(outcomes):
+        average_game_length = average_game_length + (t - average_game_length) / (e + 1)
+        wins[winner] += 1
+
+    return TournamentResult(wins, average_game_length, len(outcomes))
+
+
+def agent_name(agent):
+    if isinstance(agent, functools.partial):
+        return agent.func.__name__
+    return agent.__name__
+
+
+# Profiles of every game, grouped by pairing, written as JSON.
+def dump_profiles(path, pairings, outcomes, games):
+    with open(path, "w") as f:
+        json.dump(
+            [
+                {
+                    "white": agent_name(white_move),
+                    "red": agent_name(red_move),
+                    "games": [
+                        profile
+                        for _, _, profile in outcomes[i * games : (i + 1) * games]
+                    ],
+                }
+                for i, (white_move, red_move) in enumerate(pairings)
+            ],
+            f,
+            indent=2,
+        )
+
+
+def play_tournaments(
+    pairings,
+    games=100,
+    seed=0,
+    workers=None,
+    board_size=SIZE,
+    engine=Overboard,
+    profile_path=None,
+):
+    # Only the parent shows progress, so workers never import tqdm.
+    from tqdm import tqdm
+
+    seeds = game_seeds(seed, games)
+    tasks = [
+        (white_move, red_move, game_seed, board_size, engine, profile_path is not None)
+        for white_move, red_move in pairings
+        for game_seed in seeds
+    ]
+
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        outcomes = list(tqdm(map(play_game_task, tasks), total=len(tasks)))
+    else:
+        chunksize = max(1, len(tasks) // (workers * 16))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(
+                tqdm(
+                    pool.map(play_game_task, tasks, chunksize=chunksize),
+                    total=len(tasks),
+                )
+            )
+
+    if profile_path is not None:
+        dump_profiles(profile_path, pairings, outcomes, games)
+
+    return [
+        summarize(outcomes[i * games : (i + 1) * games]) for i in range(len(pairings))
+    ]
+
+
+def play_tournament(
+    white_move,
+    red_move,
+    games=100,
+    seed=0,
+    workers=None,
+    board_size=SIZE,
+    engine=Overboard,
+    profile_path=None,
+):
+    (result,) = play_tournaments(
+        [(white_move, red_move)],
+        games,
+        seed,
+        workers,
+        board_size,
+        engine,
+        profile_path,
+    )
+    return result
+
+
+def print_result(result, board_size=SIZE):
+    print(f"Board size: {board_size}")
+    print(f"Average game length {result.average_game_length}")
+    print(f"Wins by white: {result.wins[Overboard.PLAYER_WHITE]}")
+    print(f"Wins by red: {result.wins[Overboard.PLAYER_RED]}")
+    print(f"Incomplete games: {result.wins[0]}")
+
+
+def run_experiments(
+    games=100,
+    seed=12,
+    workers=None,
+    board_size=SIZE,
+    engine=Overboard,
+    profile_path=None,
+):
+    agents = {
+        "random_move": random_move,
+        "greedy_move": greedy_move,
+        "min_max_move": min_max_move,
+    }
+
+    names = [(name_w, name_r) for name_w in agents for name_r in agents]
+    results = play_tournaments(
+        [(agents[name_w], agents[name_r]) for name_w, name_r in names],
+        games,
+        seed,
+        workers,
+        board_size,
+        engine,
+        profile_path,
+    )
+
+    for (name_w, name_r), result in zip(names, results):
+        print(f"White: {name_w} - Red: {name_r}")
+        print_result(result, board_size)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--board-size", type=int, default=SIZE)
+    parser.add_argument(
+        "--profile", metavar="PATH", help="write per-move and per-game profiles"
+    )
+    args = parser.parse_args()
+
+    run_experiments(
+        args.games,
+        args.seed,
+        args.workers,
+        args.board_size,
+        profile_path=args.profile,
+    )
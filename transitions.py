@@ -0,0 +1,154 @@
+import functools
+import numpy as np
+from cache import load_tables
+
+# A row or column of n squares has 3**n possible contents. Lines are numbered
+# in base 3, square i being digit i (0 empty, 1 white, 2 red), and for every
+# line, piece index, direction and number of steps the tables hold the line
+# after the slide and the pieces pushed off by it. The side to move is the
+# colour of the slid piece. Tables grow as 3**n * n**2, so they are only
+# built up to MAX_BOARD_SIZE; larger boards simulate slides instead.
+MAX_BOARD_SIZE = 10
+
+# Indexes of the direction axis: towards lower, then higher square indexes.
+BACKWARD = 0
+FORWARD = 1
+
+
+def line_digits(board_size):
+    codes = np.arange(3**board_size)
+    return (codes[:, None] // 3 ** np.arange(board_size) % 3).astype(np.int8)
+
+
+# Slides every line forward at once. A piece ahead of the slider moves once
+# the gaps between them are closed, so it ends up max(0, steps - gaps)
+# squares further on, and goes overboard past the last square.
+def slide_forward(lines, index, steps):
+    count, size = lines.shape
+    rows = np.arange(count)
+    occupied = lines != 0
+    position = np.arange(size)
+    ahead = position > index
+    gaps = np.cumsum(~occupied & ahead, axis=1)
+
+    new_position = np.where(
+        occupied & ahead, position + np.maximum(0, steps - gaps), position
+    )
+    new_position[:, index] += steps
+    survives = occupied & (new_position < size)
+
+    slid = np.zeros_like(lines)
+    row_index = np.broadcast_to(rows[:, None], lines.shape)
+    slid[row_index[survives], new_position[survives]] = lines[survives]
+
+    pushed_off = occupied & ~survives
+    captures = pushed_off.sum(axis=1)
+    own_pushed_off = (pushed_off & (lines == lines[:, index : index + 1])).any(axis=1)
+    return slid, captures, own_pushed_off
+
+
+def build_tables(board_size):
+    digits = line_digits(board_size)
+    powers = 3 ** np.arange(board_size)
+    shape = (len(digits), board_size, 2, board_size - 1)
+    results = np.full(shape, -1, dtype=np.int32)
+    captures = np.zeros(shape, dtype=np.int8)
+
+    # Backward slides are forward slides of the mirrored line.
+    for direction, lines in [(FORWARD, digits), (BACKWARD, digits[:, ::-1])]:
+        for index in range(board_size - 1):
+            movable = lines[:, index] != 0
+            for steps in range(1, board_size - index):
+                slid, pushed_off, own_pushed_off = slide_forward(lines, index, steps)
+                if direction == BACKWARD:
+                    slid = slid[:, ::-1]
+                legal = movable & ~own_pushed_off
+
+                piece = index if direction == FORWARD else board_size - 1 - index
+                results[legal, piece, direction, steps - 1] = slid[legal] @ powers
+                captures[legal, piece, direction, steps - 1] = pushed_off[legal]
+
+    return results, captures
+
+
+class LineTransitions:
+    SLIDE_CACHE_SIZE = 1 << 16
+
+    def __init__(self, board_size, results, captures):
+        self.board_size = board_size
+        self.results = results
+        self.captures = captures
+        self.powers = 3 ** np.arange(board_size)
+        self.lines = line_digits(board_size)
+        self.lines.flags.writeable = False
+        self.slide_cache = {}
+
+    def encode(self, line):
+        return int(np.dot(line, self.powers))
+
+    # Like Overboard.get_shifts: every step the piece at index can slide,
+    # stopping before one of its own pieces would go overboard, with the line
+    # after the step and whether the step is a legal move. Slides are also
+    # kept once looked up, as most positions share most of their lines.
+    def slides(self, line, index, direction):
+        return self.code_slides(self.encode(line), index, direction)
+
+    # slides for a line given by its code, for engines that track lines
+    # without arrays (see bitboard.BitboardOverboard).
+    def code_slides(self, code, index, direction):
+        key = (code, index, direction)
+        slides = self.slide_cache.get(key)
+        if slides is None:
+            if len(self.slide_cache) >= self.SLIDE_CACHE_SIZE:
+                self.slide_cache.clear()
+            slides = self.slide_cache[key] = self.lookup_slides(*key)
+        return slides
+
+    def lookup_slides(self, code, index, direction):
+        d = FORWARD if direction > 0 else BACKWARD
+        results = self.results[code, index, d].tolist()
+        captures = self.captures[code, index, d].tolist()
+
+        slides = []
+        for steps, (result, captured) in enumerate(zip(results, captures), 1):
+            if result < 0:
+                break
+            slides.append(
+                (
+                    index + steps * direction,
+                    self.lines[result],
+                    steps == 1 or captured > 0,
+                )
+            )
+        return tuple(slides)
+
+    # The line after sliding steps squares, and whether that is a legal move,
+    # or None when one of the side's own pieces would go overboard first.
+    def slide(self, line, index, direction, steps):
+        code = self.encode(line)
+        d = FORWARD if direction > 0 else BACKWARD
+        result = int(self.results[code, index, d, steps - 1])
+        if result < 0:
+            return None
+        return (
+            self.lines[result],
+            steps == 1 or self.captures[code, index, d, steps - 1] > 0,
+        )
+
+
+# Tables are built the first time a board size is used and loaded from the
+# cache after that (see cache.load_tables). Returns None for boards too large
+# for tables.
+@functools.lru_cache
+def line_transitions(board_size):
+    if board_size > MAX_BOARD_SIZE:
+        return None
+
+    return LineTransitions(
+        board_size,
+        *load_tables(
+            f"line-transitions-{board_size}",
+            ["results", "captures"],
+            lambda: build_tables(board_size),
+        ),
+    )
@@ -0,0 +1,81 @@
+from collections import namedtuple
+
+TranspositionEntry = namedtuple(
+    "TranspositionEntry", ["key", "depth", "value", "bound", "move", "generation"]
+)
+
+
+class TranspositionTable:
+    EXACT = 0
+    LOWER_BOUND = 1
+    UPPER_BOUND = 2
+
+    def __init__(self, size=1 << 18):
+        assert size > 0 and size & (size - 1) == 0
+
+        self.size = size
+        self.mask = size - 1
+        self.clear()
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.filled = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+        self.rejections = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key):
+        entry = self.entries[key & self.mask]
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry.key != key:
+            self.collisions += 1
+            return None
+
+        self.hits += 1
+        return entry
+
+    # Depth-preferred replacement: within one search an entry is only
+    # replaced by a result searched at least as deep, while entries left over
+    # from earlier searches are always fair game.
+    def store(self, key, depth, value, bound, move):
+        index = key & self.mask
+        entry = self.entries[index]
+
+        if entry is None:
+            self.filled += 1
+        elif entry.generation == self.generation and entry.depth > depth:
+            self.rejections += 1
+            return
+        elif entry.key != key:
+            self.overwrites += 1
+
+        self.stores += 1
+        self.entries[index] = TranspositionEntry(
+            key, depth, value, bound, move, self.generation
+        )
+
+    def stats(self):
+        probes = self.hits + self.misses + self.collisions
+        return {
+            "size": self.size,
+            "filled": self.filled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "rejections": self.rejections,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }